@@ -0,0 +1,139 @@
+import hashlib, os, threading, yaml
+from ai.config_snapshot import load_snapshot, parse_yaml, validate, write_snapshot
+
+class _ConfigFile:
+  def __init__(self, path, data, digest, mtime, size):
+    self.path = path
+    self.data = data
+    self.digest = digest
+    self.mtime = mtime
+    self.size = size
+
+class ConfigService:
+  def __init__(self):
+    self._files = {}
+    self._subscribers = {}
+    self._lock = threading.Lock()
+    self._stop = threading.Event()
+    self._thread = None
+
+  def _read(self, path):
+    stat = os.stat(path)
+    with open(path, 'rb') as f:
+      raw = f.read()
+    return raw, hashlib.sha256(raw).hexdigest(), stat.st_mtime_ns, stat.st_size
+
+  def _parse(self, path, raw, digest):
+    # snapshot z kroku budowania (albo z poprzedniego startu) omija parsowanie YAML, o ile hash treści się zgadza
+    data = load_snapshot(path, digest)
+    if data is not None:
+      return data, []
+
+    data = parse_yaml(raw)
+    errors = validate(path, data)
+    if not errors:
+      try:
+        write_snapshot(path, digest, data)
+      except OSError as e:
+        print(f"[Config] Cannot write snapshot for {path}: {e}")
+    return data, errors
+
+  def get(self, path):
+    # sparsowany obiekt jest współdzielony przez wszystkich odbiorców - kto chce go zmieniać, robi kopię
+    path = os.path.abspath(path)
+    with self._lock:
+      entry = self._files.get(path)
+      if entry is None:
+        raw, digest, mtime, size = self._read(path)
+        data, errors = self._parse(path, raw, digest)
+        for error in errors:
+          print(f"[Config] {path}: {error}")
+        entry = _ConfigFile(path, data, digest, mtime, size)
+        self._files[path] = entry
+        print(f"[Config] Loaded: {path}")
+      return entry.data
+
+  def digest(self, path):
+    with self._lock:
+      entry = self._files.get(os.path.abspath(path))
+      return entry.digest if entry else None
+
+  def subscribe(self, path, callback):
+    path = os.path.abspath(path)
+    with self._lock:
+      self._subscribers.setdefault(path, []).append(callback)
+
+  def unsubscribe(self, path, callback):
+    path = os.path.abspath(path)
+    with self._lock:
+      callbacks = self._subscribers.get(path, [])
+      if callback in callbacks:
+        callbacks.remove(callback)
+
+  def check(self):
+    # jedno przejście: mtime/rozmiar jako tani test, hash treści rozstrzyga, czy coś się naprawdę zmieniło
+    with self._lock:
+      entries = list(self._files.values())
+
+    changed = []
+    for entry in entries:
+      try:
+        stat = os.stat(entry.path)
+        if stat.st_mtime_ns == entry.mtime and stat.st_size == entry.size:
+          continue
+        raw, digest, mtime, size = self._read(entry.path)
+      except OSError as e:
+        print(f"[Config] Cannot read {entry.path}, keeping previous version: {e}")
+        continue
+
+      if digest == entry.digest:
+        with self._lock:
+          entry.mtime, entry.size = mtime, size
+        continue
+
+      try:
+        data, errors = self._parse(entry.path, raw, digest)
+      except yaml.YAMLError as e:
+        errors = [f"invalid YAML: {e}"]
+      if errors:
+        # błędny plik nie podmienia działającej konfiguracji; spróbujemy po następnej zmianie
+        print(f"[Config] {entry.path} failed validation, keeping previous version: {'; '.join(errors)}")
+        with self._lock:
+          entry.mtime, entry.size = mtime, size
+        continue
+
+      with self._lock:
+        self._files[entry.path] = _ConfigFile(entry.path, data, digest, mtime, size)
+        callbacks = list(self._subscribers.get(entry.path, []))
+      print(f"[Config] Reloaded: {entry.path}")
+      changed.append(entry.path)
+
+      for callback in callbacks:
+        try:
+          callback(data)
+        except Exception as e:
+          print(f"[Config] Subscriber failed for {entry.path}: {e}")
+    return changed
+
+  def start(self, interval=2.0):
+    with self._lock:
+      if self._thread and self._thread.is_alive():
+        return
+      self._stop.clear()
+      self._thread = threading.Thread(target=self._watch, args=(interval,), name="config-watcher", daemon=True)
+      self._thread.start()
+
+  def stop(self):
+    self._stop.set()
+    if self._thread:
+      self._thread.join()
+      self._thread = None
+
+  def _watch(self, interval):
+    while not self._stop.wait(interval):
+      try:
+        self.check()
+      except Exception as e:
+        print(f"[Config] Watcher error: {e}")
+
+config_service = ConfigService()
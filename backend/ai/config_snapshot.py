@@ -0,0 +1,142 @@
+import glob, hashlib, os, pickle, sys, yaml
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOT_DIR = os.path.join(BACKEND_DIR, ".config_cache")
+SNAPSHOT_VERSION = 1
+CONFIG_GLOBS = [
+  os.path.join(BACKEND_DIR, "ai", "config", "*.yaml"),
+  os.path.join(BACKEND_DIR, "config", "*.yaml")
+]
+# LibYAML, jeśli jest zainstalowany; czysto pythonowy parser jest kilkanaście razy wolniejszy
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+def parse_yaml(raw):
+  return yaml.load(raw, Loader=YAML_LOADER) or {}
+
+def _check(errors, where, value, key, types, required=True):
+  if not isinstance(value, dict):
+    errors.append(f"{where}: expected a mapping")
+    return None
+  if key not in value:
+    if required:
+      errors.append(f"{where}: missing '{key}'")
+    return None
+  if not isinstance(value[key], types):
+    errors.append(f"{where}.{key}: expected {' or '.join(t.__name__ for t in (types if isinstance(types, tuple) else (types,)))}")
+    return None
+  return value[key]
+
+def _validate_dialog(data, errors):
+  characters = _check(errors, "config", data, "characters", dict) or {}
+  for character, char in characters.items():
+    where = f"characters.{character}"
+    _check(errors, where, char, "name", str)
+    _check(errors, where, char, "memory_fragments", list, required=False)
+    _check(errors, where, char, "speech_patterns", list, required=False)
+  _check(errors, "config", data, "rules", list, required=False)
+  _check(errors, "config", data, "world_lore", dict, required=False)
+  responses = _check(errors, "config", data, "responses", dict, required=False) or {}
+  for pool, entries in responses.items():
+    if not isinstance(entries, dict):
+      errors.append(f"responses.{pool}: expected a mapping of character -> text or list")
+
+def _validate_quests(data, errors):
+  quests = _check(errors, "quests.yaml", data, "quests", list) or []
+  seen = set()
+  for index, quest in enumerate(quests):
+    where = f"quests[{index}]"
+    quest_id = _check(errors, where, quest, "id", str)
+    _check(errors, where, quest, "title", str)
+    _check(errors, where, quest, "completed_by", list)
+    _check(errors, where, quest, "steps", list, required=False)
+    if quest_id in seen:
+      errors.append(f"{where}: duplicate id '{quest_id}'")
+    seen.add(quest_id)
+
+def _validate_quest_templates(data, errors):
+  templates = _check(errors, "quest_templates.yaml", data, "quest_templates", dict) or {}
+  for template_id, template in templates.items():
+    where = f"quest_templates.{template_id}"
+    _check(errors, where, template, "title", str)
+    _check(errors, where, template, "steps", list, required=False)
+
+def _validate_crafting(data, errors):
+  recipes = _check(errors, "crafting.yaml", data, "recipes", dict) or {}
+  for recipe_id, recipe in recipes.items():
+    where = f"recipes.{recipe_id}"
+    _check(errors, where, recipe, "name", str)
+    _check(errors, where, recipe, "level_required", int)
+    _check(errors, where, recipe, "gold_cost", int)
+    result = _check(errors, where, recipe, "result", dict)
+    if result is not None:
+      _check(errors, f"{where}.result", result, "id", str)
+    for index, material in enumerate(_check(errors, where, recipe, "materials", list) or []):
+      for key, types in (("id", str), ("name", str), ("quantity", int)):
+        _check(errors, f"{where}.materials[{index}]", material, key, types)
+  _check(errors, "crafting.yaml", data, "materials", dict, required=False)
+
+VALIDATORS = {
+  "config_enhanced.yaml": _validate_dialog,
+  "config.yaml": _validate_dialog,
+  "quests.yaml": _validate_quests,
+  "quest_templates.yaml": _validate_quest_templates,
+  "crafting.yaml": _validate_crafting
+}
+
+def validate(path, data):
+  errors = []
+  validator = VALIDATORS.get(os.path.basename(path))
+  if validator:
+    validator(data, errors)
+  return errors
+
+def snapshot_path(path):
+  path = os.path.abspath(path)
+  key = hashlib.sha1(path.encode("utf-8")).hexdigest()[:12]
+  return os.path.join(SNAPSHOT_DIR, f"{os.path.basename(path)}.{key}.pickle")
+
+def load_snapshot(path, digest):
+  # snapshot jest ważny tylko dla dokładnie tej treści pliku; inaczej wracamy do YAML
+  try:
+    with open(snapshot_path(path), 'rb') as f:
+      snapshot = pickle.load(f)
+  except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+    return None
+  if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("digest") != digest:
+    return None
+  return snapshot["data"]
+
+def write_snapshot(path, digest, data):
+  target = snapshot_path(path)
+  os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+  temp_path = f"{target}.tmp.{os.getpid()}"
+  with open(temp_path, 'wb') as f:
+    pickle.dump({"version": SNAPSHOT_VERSION, "source": os.path.abspath(path), "digest": digest, "data": data}, f, protocol=pickle.HIGHEST_PROTOCOL)
+  os.replace(temp_path, target)
+  return target
+
+def compile_all(paths=None):
+  # krok budowania: parsuje i waliduje wszystkie configi, zapisuje snapshoty; błędny config przerywa build
+  failed = False
+  for path in paths or sorted(p for pattern in CONFIG_GLOBS for p in glob.glob(pattern)):
+    with open(path, 'rb') as f:
+      raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+    try:
+      data = parse_yaml(raw)
+    except yaml.YAMLError as e:
+      print(f"[ConfigSnapshot] {path}: invalid YAML: {e}")
+      failed = True
+      continue
+
+    errors = validate(path, data)
+    if errors:
+      failed = True
+      for error in errors:
+        print(f"[ConfigSnapshot] {path}: {error}")
+      continue
+    print(f"[ConfigSnapshot] {path} -> {write_snapshot(path, digest, data)}")
+  return not failed
+
+if __name__ == "__main__":
+  sys.exit(0 if compile_all(sys.argv[1:] or None) else 1)
@@ -0,0 +1,196 @@
+import os, sqlite3, threading
+from ai.dialog.lexicon import find_modern_words
+
+FANTASY_KEYWORDS = ["tavern", "ale", "mine", "silver", "merchant", "gold", "stonehaven", "village"]
+CONSISTENCY_KEYWORDS = {
+  "tavern_keeper": ["ale", "tavern", "drink"],
+  "worried_miner": ["mine", "tomek", "worry"],
+  "merchant": ["gold", "trade", "buy", "sell"]
+}
+TOTAL_FIELDS = ("interactions", "response_time", "quality", "consistency", "fantasy", "errors")
+
+def empty_totals():
+  return dict.fromkeys(TOTAL_FIELDS, 0)
+
+def log_contribution(log):
+  # wkład jednego wpisu do wszystkich metryk; te same liczby sumują RollingMetrics i rollupy w SQLite
+  response = log.get("bot_response", "").lower()
+  character = log.get("character", "")
+  quality = log.get("quality_metrics", {})
+
+  if character == "mysterious_stranger":
+    consistent = "..." in response
+  else:
+    consistent = any(word in response for word in CONSISTENCY_KEYWORDS.get(character, []))
+
+  issues = []
+  if quality.get("has_modern_words", False):
+    issues.append("Modern words detected in fantasy setting")
+  if not quality.get("appropriate_length", True):
+    issues.append("Response length inappropriate")
+  if not quality.get("has_punctuation", True):
+    issues.append("Missing punctuation in response")
+  if log.get("has_error", False):
+    issues.append(f"Model error: {log.get('error_message', 'Unknown')}")
+
+  return {
+    "interactions": 1,
+    "response_time": log.get("response_time", 0),
+    "quality": quality.get("overall_score", 0),
+    "consistency": 1 if consistent else 0,
+    "fantasy": 0.5 * sum(1 for keyword in FANTASY_KEYWORDS if keyword in response) - 2 * len(find_modern_words(response)),
+    "errors": 1 if log.get("has_error", False) else 0,
+    "issues": issues
+  }
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  timestamp TEXT,
+  session_id TEXT,
+  character TEXT,
+  location TEXT,
+  user_input TEXT,
+  bot_response TEXT,
+  has_error INTEGER,
+  error_message TEXT,
+  overall_score REAL
+);
+CREATE INDEX IF NOT EXISTS idx_turns_session ON turns(session_id);
+CREATE INDEX IF NOT EXISTS idx_turns_character ON turns(character);
+CREATE INDEX IF NOT EXISTS idx_turns_timestamp ON turns(timestamp);
+CREATE TABLE IF NOT EXISTS rollups (
+  scope TEXT PRIMARY KEY,
+  interactions INTEGER NOT NULL DEFAULT 0,
+  response_time REAL NOT NULL DEFAULT 0,
+  quality REAL NOT NULL DEFAULT 0,
+  consistency INTEGER NOT NULL DEFAULT 0,
+  fantasy REAL NOT NULL DEFAULT 0,
+  errors INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS character_rollups (
+  scope TEXT NOT NULL,
+  character TEXT NOT NULL,
+  interactions INTEGER NOT NULL DEFAULT 0,
+  quality REAL NOT NULL DEFAULT 0,
+  PRIMARY KEY (scope, character)
+);
+CREATE TABLE IF NOT EXISTS meta (
+  key TEXT PRIMARY KEY,
+  value TEXT
+);
+CREATE TABLE IF NOT EXISTS issue_rollups (
+  scope TEXT NOT NULL,
+  issue TEXT NOT NULL,
+  count INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (scope, issue)
+);
+"""
+
+def _scope(session_id=None):
+  return f"session:{session_id}" if session_id else "global"
+
+class SqliteAnalytics:
+  def __init__(self, path="data/conversation_analytics.db"):
+    self.path = path
+    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+    self._lock = threading.Lock()
+    self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+    # WAL: workery dopisują tury, a proces Flaska w tym czasie czyta raporty
+    self._conn.execute("PRAGMA journal_mode=WAL")
+    self._conn.execute("PRAGMA synchronous=NORMAL")
+    self._conn.executescript(SCHEMA)
+
+  def backfill(self, read_entries):
+    # workery i proces Flaska startują naraz: sprawdzenie i wczytanie historii muszą być jedną
+    # transakcją z blokadą zapisu, inaczej każdy proces wczyta cały JSONL i rollupy się zwielokrotnią
+    with self._lock:
+      self._conn.execute("BEGIN IMMEDIATE")
+      try:
+        done = self._conn.execute("SELECT 1 FROM meta WHERE key = 'backfilled'").fetchone()
+        has_turns = self._conn.execute("SELECT 1 FROM turns LIMIT 1").fetchone()
+        count = 0
+        if not done and not has_turns:
+          logs = list(read_entries())
+          self._insert(logs)
+          count = len(logs)
+        self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('backfilled', datetime('now'))")
+        self._conn.commit()
+      except Exception:
+        self._conn.rollback()
+        raise
+    return count
+
+  def record_many(self, logs):
+    with self._lock, self._conn:
+      self._insert(logs)
+
+  def _insert(self, logs):
+    for log in logs:
+      contribution = log_contribution(log)
+      session_id = log.get("session_id")
+      character = log.get("character", "unknown")
+
+      self._conn.execute(
+        "INSERT INTO turns (timestamp, session_id, character, location, user_input, bot_response, has_error, error_message, overall_score) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (log.get("timestamp"), session_id, character, log.get("location"), log.get("user_input"),
+         log.get("bot_response"), contribution["errors"], log.get("error_message"), contribution["quality"])
+      )
+
+      scopes = ["global"] + ([_scope(session_id)] if session_id else [])
+      for scope in scopes:
+        self._conn.execute(
+          "INSERT INTO rollups (scope, interactions, response_time, quality, consistency, fantasy, errors) "
+          "VALUES (?, 1, ?, ?, ?, ?, ?) "
+          "ON CONFLICT(scope) DO UPDATE SET "
+          "interactions = interactions + 1, response_time = response_time + excluded.response_time, "
+          "quality = quality + excluded.quality, consistency = consistency + excluded.consistency, "
+          "fantasy = fantasy + excluded.fantasy, errors = errors + excluded.errors",
+          (scope, contribution["response_time"], contribution["quality"], contribution["consistency"],
+           contribution["fantasy"], contribution["errors"])
+        )
+        self._conn.execute(
+          "INSERT INTO character_rollups (scope, character, interactions, quality) VALUES (?, ?, 1, ?) "
+          "ON CONFLICT(scope, character) DO UPDATE SET "
+          "interactions = interactions + 1, quality = quality + excluded.quality",
+          (scope, character, contribution["quality"])
+        )
+        for issue in contribution["issues"]:
+          self._conn.execute(
+            "INSERT INTO issue_rollups (scope, issue, count) VALUES (?, ?, 1) "
+            "ON CONFLICT(scope, issue) DO UPDATE SET count = count + 1",
+            (scope, issue)
+          )
+
+  def totals(self, session_id=None):
+    with self._lock:
+      row = self._conn.execute(
+        f"SELECT {', '.join(TOTAL_FIELDS)} FROM rollups WHERE scope = ?", (_scope(session_id),)
+      ).fetchone()
+    return dict(zip(TOTAL_FIELDS, row)) if row else None
+
+  def character_breakdown(self, session_id=None):
+    with self._lock:
+      rows = self._conn.execute(
+        "SELECT character, interactions, quality FROM character_rollups WHERE scope = ? ORDER BY rowid",
+        (_scope(session_id),)
+      ).fetchall()
+    return {character: {"interactions": interactions, "quality": quality} for character, interactions, quality in rows}
+
+  def common_issues(self, session_id=None, limit=10):
+    with self._lock:
+      rows = self._conn.execute(
+        "SELECT issue FROM issue_rollups WHERE scope = ? ORDER BY count DESC, rowid LIMIT ?",
+        (_scope(session_id), limit)
+      ).fetchall()
+    return [issue for (issue,) in rows]
+
+  def recent_character_scores(self, last_n=50):
+    with self._lock:
+      rows = self._conn.execute(
+        "SELECT character, COUNT(*), SUM(overall_score) FROM "
+        "(SELECT character, overall_score FROM turns ORDER BY id DESC LIMIT ?) GROUP BY character",
+        (last_n,)
+      ).fetchall()
+    return {character: {"count": count, "total_score": total_score or 0} for character, count, total_score in rows}
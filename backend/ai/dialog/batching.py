@@ -0,0 +1,76 @@
+import threading, time
+
+class _PendingRequest:
+  def __init__(self, request):
+    self.request = request
+    self.result = None
+    self.error = None
+    self.done = threading.Event()
+
+class BatchScheduler:
+  def __init__(self, generate_batch, max_batch_size=4, window_ms=20):
+    self.generate_batch = generate_batch
+    self.max_batch_size = max(1, int(max_batch_size))
+    self.window = max(0, window_ms) / 1000.0
+    self._pending = []
+    self._condition = threading.Condition()
+    self._closed = False
+    self._worker = threading.Thread(target=self._run, name="dialog-batch-scheduler", daemon=True)
+    self._worker.start()
+
+  def submit(self, request):
+    pending = _PendingRequest(request)
+    with self._condition:
+      if self._closed:
+        raise RuntimeError("Batch scheduler is closed")
+      self._pending.append(pending)
+      self._condition.notify()
+
+    pending.done.wait()
+    if pending.error is not None:
+      raise pending.error
+    return pending.result
+
+  def close(self):
+    with self._condition:
+      self._closed = True
+      self._condition.notify()
+    self._worker.join()
+
+  def _next_batch(self):
+    with self._condition:
+      while not self._pending and not self._closed:
+        self._condition.wait()
+      if not self._pending:
+        return None
+
+      # czekamy chwilę na kolejne prompty z innych sesji, zanim odpalimy generate
+      deadline = time.monotonic() + self.window
+      while len(self._pending) < self.max_batch_size and not self._closed:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+          break
+        self._condition.wait(remaining)
+
+      batch = self._pending[:self.max_batch_size]
+      del self._pending[:self.max_batch_size]
+      return batch
+
+  def _run(self):
+    while True:
+      batch = self._next_batch()
+      if batch is None:
+        return
+
+      if len(batch) > 1:
+        print(f"[Batch] Generating {len(batch)} requests in one pass")
+      try:
+        results = self.generate_batch([pending.request for pending in batch])
+        for pending, result in zip(batch, results):
+          pending.result = result
+      except Exception as e:
+        for pending in batch:
+          pending.error = e
+      finally:
+        for pending in batch:
+          pending.done.set()
@@ -1,28 +1,33 @@
-import yaml, os
+import os
+from ai.config_service import config_service
 
 class ConfigLoader:
   def __init__(self):
     pass
 
-  def load_config(self):
+  def config_files(self):
     current_dir = os.path.dirname(os.path.abspath(__file__))
     backend_dir = os.path.dirname(os.path.dirname(current_dir))
-    
-    config_files = [
+
+    return [
       os.path.join(backend_dir, "ai/config/config_enhanced.yaml"),
       os.path.join(backend_dir, "ai/config/config.yaml")
     ]
-    config = {}
-    
-    for config_file in config_files:
+
+  def config_path(self):
+    for config_file in self.config_files():
+      if os.path.exists(config_file):
+        return config_file
+    return None
+
+  def load_config(self):
+    # plik parsuje config_service raz; kolejne wywołania dostają ten sam obiekt aż do zmiany pliku
+    for config_file in self.config_files():
       try:
-        with open(config_file, "r", encoding='utf-8') as f:
-          config = yaml.safe_load(f)
-          print(f"[Config] Loaded: {config_file}")
-          return config 
+        return config_service.get(config_file)
       except FileNotFoundError:
         continue
-    
+
     print("[Config load error] No config file found. Using empty configuration.")
     return {
       "characters": {},
@@ -30,4 +35,14 @@ class ConfigLoader:
       "rules": [],
       "world_lore": {},
       "quest_hooks": []
-    }
\ No newline at end of file
+    }
+
+  def subscribe(self, callback):
+    config_file = self.config_path()
+    if config_file:
+      config_service.subscribe(config_file, callback)
+
+  def unsubscribe(self, callback):
+    config_file = self.config_path()
+    if config_file:
+      config_service.unsubscribe(config_file, callback)
@@ -1,258 +1,555 @@
-import torch, time, re, yaml, random
-from transformers import AutoModelForCausalLM, AutoTokenizer
+import torch, time, re, yaml, random, threading
+from transformers import GenerationConfig, StoppingCriteriaList, TextIteratorStreamer
+from ai.model_registry import model_registry, default_device, DEFAULT_MODEL_NAME
 from ai.dialog.tracker import ConversationTracker
 from ai.dialog.config_loader import ConfigLoader
+from ai.dialog.batching import BatchScheduler
+from ai.dialog.prefix_cache import PrefixCache
+from ai.dialog.history_store import ConversationHistoryStore
+from ai.dialog.prompt_budget import PromptBudgeter
+from ai.dialog.response_cache import ResponseCache
+from ai.dialog.response_table import ResponseTable
+from ai.dialog.memory_index import build_memory_indexes
+from ai.dialog.stopping import StopEventCriteria, SpeakerTurnStoppingCriteria
 from ai.dialog.engine_utils import (
-  clean_response, build_conversation_prompt, extract_character_response,
-  responses_too_similar, extract_alternative_response
+  clean_response, build_conversation_prompt, build_prompt_header, extract_character_response,
+  responses_too_similar, extract_alternative_response, split_at_speaker_change
 )
 
 class DialogEngine:
-  def __init__(self):
+  def __init__(self, quantization=None, lazy=None):
     torch.set_float32_matmul_precision('high')
-    self.model_name = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
-    self.device = "cuda" if torch.cuda.is_available() else "cpu"
+    self.model_name = DEFAULT_MODEL_NAME
+    self.device = default_device()
     print(f"Using device: {self.device}")
     
-    self.conversation_tracker = ConversationTracker()
-    self.tokenizer = AutoTokenizer.from_pretrained(
-      self.model_name,
-      local_files_only=True,
-      trust_remote_code=True
+    self.config_loader = ConfigLoader() 
+    self.response_cache = None
+    self.response_table = None
+    self.load_config()
+    history = self.inference_config.get("history", {})
+    self.conversation_history = ConversationHistoryStore(
+      max_sessions=history.get("max_sessions", 10000),
+      ttl=history.get("ttl_seconds", 3600),
+      max_turns=history.get("max_turns", 5)
     )
-    if self.tokenizer.pad_token is None:
-      self.tokenizer.pad_token = self.tokenizer.eos_token
-
-    self.model = AutoModelForCausalLM.from_pretrained(
-      self.model_name,
-      torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
-      trust_remote_code=True,
-      device_map=self.device,
-      local_files_only=True
+    # parametr konstruktora ma pierwszeństwo przed configiem (np. przy porównaniu jakości w testach)
+    self.quantization = quantization or self.inference_config.get("quantization", "none")
+
+    self.conversation_tracker = ConversationTracker(analytics_config=self.analytics_config)
+    self.model, self.tokenizer = None, None
+    self._model_released = True
+    self.prefix_cache = None
+    self.batch_scheduler = None
+    self.prompt_budgeter = None
+    self.assistant_model, self.assistant_model_name = None, None
+    self.prompt_lookup_tokens = None
+    self.load_error = None
+    self._ready = threading.Event()
+    self._load_thread = None
+    self.config_loader.subscribe(self._on_config_change)
+
+    if lazy is None:
+      lazy = self.inference_config.get("lazy_load", False)
+    if lazy:
+      # serwer wstaje od razu, wagi i rozgrzewka modelu lecą w tle
+      self._load_thread = threading.Thread(target=self._load_in_background, name="dialog-model-loader", daemon=True)
+      self._load_thread.start()
+    else:
+      self._load_model()
+      self._ready.set()
+
+  def _load_model(self):
+    self.model, self.tokenizer = model_registry.acquire(self.model_name, self.device, self.quantization)
+    self._model_released = False
+
+    prompt_budget = self.inference_config.get("prompt_budget", {})
+    self.prompt_budgeter = PromptBudgeter(
+      self.tokenizer,
+      max_tokens=prompt_budget.get("max_tokens", 512),
+      margin=prompt_budget.get("margin", 16)
     )
 
-    if torch.__version__ >= "2.0" and self.device == "cuda":
-      self.model = torch.compile(self.model)
+    assisted = self.inference_config.get("assisted_decoding", {})
+    if assisted.get("enabled", False):
+      self._load_assistant(assisted)
 
-    self.conversation_history = {}
-    self.config_loader = ConfigLoader() 
-    self.load_config()
+    prefix_cache = self.inference_config.get("prefix_cache", {})
+    if prefix_cache.get("enabled", False):
+      self.prefix_cache = PrefixCache(self.model, self.tokenizer, prefix_cache.get("max_entries", 16))
+
+    batching = self.inference_config.get("batching", {})
+    if batching.get("enabled", False):
+      self.batch_scheduler = BatchScheduler(
+        self._generate_requests,
+        max_batch_size=batching.get("max_batch_size", 4),
+        window_ms=batching.get("window_ms", 20)
+      )
+
+  def _load_assistant(self, assisted):
+    # mały model szkicowy proponuje kilka tokenów, TinyLlama sprawdza je jednym przebiegiem
+    draft_model = assisted.get("draft_model")
+    if draft_model:
+      try:
+        assistant, assistant_tokenizer = model_registry.acquire(draft_model, self.device, "none")
+        if len(assistant_tokenizer) == len(self.tokenizer):
+          self.assistant_model, self.assistant_model_name = assistant, draft_model
+          print(f"[DialogEngine] Assisted decoding with draft model {draft_model}")
+          return
+        print(f"[DialogEngine] Draft model {draft_model} uses a different vocabulary, not using it")
+        model_registry.release(draft_model, self.device, "none")
+      except Exception as e:
+        print(f"[DialogEngine] Draft model {draft_model} not available locally: {e}")
+
+    # bez modelu szkicowego: szkic z n-gramów samego promptu, jeśli ta wersja transformers to potrafi
+    if "prompt_lookup_num_tokens" in GenerationConfig().to_dict():
+      self.prompt_lookup_tokens = assisted.get("prompt_lookup_tokens", 10)
+      print(f"[DialogEngine] Assisted decoding with prompt lookup ({self.prompt_lookup_tokens} tokens)")
+    else:
+      print("[DialogEngine] No draft available, using regular decoding")
+
+  def _assisted_kwargs(self):
+    if self.assistant_model is not None:
+      return {"assistant_model": self.assistant_model}
+    if self.prompt_lookup_tokens:
+      return {"prompt_lookup_num_tokens": self.prompt_lookup_tokens}
+    return {}
+
+  def _load_in_background(self):
+    start_time = time.time()
+    try:
+      self._load_model()
+      self._warmup()
+      print(f"[DialogEngine] Model ready after {time.time() - start_time:.1f}s")
+    except Exception as e:
+      self.load_error = e
+      print(f"[DialogEngine] Model loading failed: {e}")
+    finally:
+      self._ready.set()
+
+  def _warmup(self):
+    # pierwszy generate płaci za kompilację i alokacje, niech nie trafi na gracza
+    inputs = self.tokenizer("Visitor: Hello", return_tensors="pt").to(self.model.device)
+    with torch.no_grad():
+      self.model.generate(
+        **inputs,
+        max_new_tokens=1,
+        pad_token_id=self.tokenizer.eos_token_id,
+        eos_token_id=self.tokenizer.eos_token_id
+      )
+
+  def is_ready(self):
+    return self._ready.is_set() and self.load_error is None
+
+  def wait_until_ready(self, timeout=None):
+    if not self._ready.wait(timeout):
+      raise RuntimeError("Dialog model is still loading")
+    if self.load_error is not None:
+      raise RuntimeError(f"Dialog model failed to load: {self.load_error}")
+
+  def close(self):
+    self.config_loader.unsubscribe(self._on_config_change)
+    if self._load_thread:
+      self._load_thread.join()
+      self._load_thread = None
+    if self.batch_scheduler:
+      self.batch_scheduler.close()
+      self.batch_scheduler = None
+    if not self._model_released:
+      model_registry.release(self.model_name, self.device, self.quantization)
+      self._model_released = True
+    if self.assistant_model is not None:
+      model_registry.release(self.assistant_model_name, self.device, "none")
+      self.assistant_model, self.assistant_model_name = None, None
 
   def load_config(self):
     config = self.config_loader.load_config()
-    self.characters = config.get("characters", {})
+    # indeksy liczymy przed podmianą, żeby równoległe zapytanie nie trafiło na nowe postacie ze starym indeksem
+    characters = config.get("characters", {})
+    memory_indexes = build_memory_indexes(characters)
+    self.characters, self.memory_indexes = characters, memory_indexes
     self.locations = config.get("locations", {})
     self.rules = config.get("rules", [])
     self.world_lore = config.get("world_lore", {})
     self.quest_hooks = config.get("quest_hooks", [])
+    self.inference_config = config.get("inference", {})
+    self.analytics_config = config.get("analytics", {})
+    if self.response_table is None:
+      self.response_table = ResponseTable(config.get("responses", {}))
+    else:
+      self.response_table.load(config.get("responses", {}))
+
+    response_cache = self.inference_config.get("response_cache", {})
+    if self.response_cache is None and response_cache.get("enabled", False):
+      self.response_cache = ResponseCache(
+        max_entries=response_cache.get("max_entries", 512),
+        variants_per_key=response_cache.get("variants_per_key", 3)
+      )
+    if self.response_cache:
+      changed = self.response_cache.sync_characters(self.characters, self.world_lore)
+      if changed and len(self.response_cache):
+        print(f"[ResponseCache] Config changed for: {', '.join(sorted(changed))}")
+
+  def _on_config_change(self, config):
+    # postacie, lore i pule odpowiedzi podmieniamy bez restartu; model i ustawienia inferencji czekają na restart
+    self.load_config()
+    if self.prefix_cache:
+      self.prefix_cache.invalidate()
+    print("[DialogEngine] Config reloaded, dialog caches rebuilt")
+
+  def _generation_kwargs(self):
+    return {
+      "max_new_tokens": 80,      # ograniczenie długości odpowiedzi
+      "temperature": 0.7,        # kreatywność/losowość odpowiedzi
+      "top_k": 40,              # top-k najbardziej prawdopodobnych tokenów
+      "top_p": 0.85,            # suma prawdopodobieństw tokenów
+      "repetition_penalty": 1.2, # kara za powtarzanie się
+      "do_sample": True,
+      "no_repeat_ngram_size": 3,
+      "pad_token_id": self.tokenizer.eos_token_id,
+      "eos_token_id": self.tokenizer.eos_token_id,
+      "use_cache": True,
+      "early_stopping": False 
+    }
+
+  def _stopping_criteria(self, prompt_length, *extra):
+    return StoppingCriteriaList([*extra, SpeakerTurnStoppingCriteria(self.tokenizer, prompt_length)])
+
+  def _decode_outputs(self, output, input_length, prompts):
+    # padding jest z lewej, więc wygenerowane tokeny zaczynają się za input_ids w każdym wierszu;
+    # dekodujemy tylko je, pełny tekst to prompt + odpowiedź (jak przy streamingu)
+    results = []
+    for row, prompt in zip(output, prompts):
+      generated_only = self.tokenizer.decode(row[input_length:], skip_special_tokens=True).strip()
+      results.append((f"{prompt} {generated_only}", generated_only))
+    return results
+
+  def _check_prompt_length(self, prompt_length):
+    if self.prompt_budgeter and prompt_length > self.prompt_budgeter.max_tokens:
+      print(f"[PromptBudget] Prompt has {prompt_length} tokens, over the {self.prompt_budgeter.max_tokens} token budget")
+
+  def _prepare_inputs(self, prompt, header=None, character=None, use_prefix_cache=True):
+    # długość pilnuje PromptBudgeter; bez truncation, żeby nie obciąć promptu po cichu
+    inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
+    self._check_prompt_length(inputs.input_ids.shape[1])
+
+    if not self.prefix_cache or not header or not use_prefix_cache:
+      return dict(inputs)
+
+    prefix = self.prefix_cache.get(character, header)
+    prefix_length = prefix.input_ids.shape[1]
+    input_ids = inputs.input_ids
+    if input_ids.shape[1] <= prefix_length + 1 or not torch.equal(input_ids[0, :prefix_length], prefix.input_ids[0]):
+      print("[PrefixCache] Prompt does not start with the cached header, skipping prefix cache")
+      return dict(inputs)
+
+    # prefill tylko dynamicznej części promptu; ostatni token zostawiamy dla generate
+    with torch.no_grad():
+      suffix = self.model(
+        input_ids[:, prefix_length:-1],
+        past_key_values=prefix.clone_past(),
+        use_cache=True
+      )
+    return {
+      "input_ids": input_ids,
+      "attention_mask": inputs.attention_mask,
+      "past_key_values": suffix.past_key_values
+    }
+
+  def _generate_single(self, prompt, header=None, character=None):
+    # assisted generate działa tylko dla pojedynczego promptu i sam prowadzi past_key_values obu modeli
+    assisted_kwargs = self._assisted_kwargs()
+    inputs = self._prepare_inputs(prompt, header, character, use_prefix_cache=not assisted_kwargs)
+    input_length = inputs["input_ids"].shape[1]
+
+    with torch.no_grad():
+      output = self.model.generate(
+        **inputs,
+        **self._generation_kwargs(),
+        **assisted_kwargs,
+        stopping_criteria=self._stopping_criteria(input_length)
+      )
+    return self._decode_outputs(output, input_length, [prompt])[0]
+
+  def _generate_batch(self, prompts):
+    inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.model.device)
+    input_length = inputs.input_ids.shape[1]
+    self._check_prompt_length(input_length)
+
+    with torch.no_grad():
+      output = self.model.generate(
+        **inputs,
+        **self._generation_kwargs(),
+        stopping_criteria=self._stopping_criteria(input_length)
+      )
+    return self._decode_outputs(output, input_length, prompts)
+
+  def _generate_requests(self, requests):
+    if len(requests) == 1:
+      return [self._generate_single(*requests[0])]
+    return self._generate_batch([prompt for prompt, header, character in requests])
+
+  def _generate(self, prompt, header=None, character=None):
+    if self.batch_scheduler:
+      return self.batch_scheduler.submit((prompt, header, character))
+    return self._generate_single(prompt, header, character)
 
   def reset_conversation(self, session_id="default", character=None):
-    if character:
-      key = f"{session_id}_{character}"
-      self.conversation_history[key] = []
-    else:
-      keys_to_reset = [k for k in self.conversation_history.keys() if k.startswith(f"{session_id}_")]
-      for key in keys_to_reset:
-        self.conversation_history[key] = []
+    self.conversation_history.reset(session_id, character)
+    self.response_table.reset(session_id, character)
 
   def get_npc_response(self, user_input, character="tavern_keeper", session_id="default", player_stats=None):
     start_time = time.time()
-    history_key = f"{session_id}_{character}"
-    if history_key not in self.conversation_history:
-      self.conversation_history[history_key] = []
+    try:
+      # budżet promptu liczy tokeny, więc tokenizer musi być już załadowany
+      self.wait_until_ready()
+    except Exception as e:
+      return self._error_response(e, user_input, character, session_id, player_stats)
+
+    cache_key, cached = self._lookup_cached_response(user_input, character, session_id)
+    if cached:
+      return self._cached_response(cached, user_input, character, session_id, player_stats, start_time)
 
     prompt = build_conversation_prompt(
       user_input, character, session_id, player_stats,
-      self.characters, self.world_lore, self.conversation_history
+      self.characters, self.world_lore, self.conversation_history, self.memory_indexes,
+      self.prompt_budgeter, self.response_table
     )
     
     if prompt.startswith("DIRECT_RESPONSE:"):
-      response = prompt[15:] 
-      self.conversation_tracker.log_interaction(
-        user_input=user_input,
-        bot_response=response,
-        character=character,
-        session_id=session_id,
-        player_stats=player_stats
-      )
-      return response
+      return self._direct_response(prompt, user_input, character, session_id, player_stats)
       
     if "Character not found" in prompt:
       return prompt
 
+    header = build_prompt_header(character, self.characters, self.world_lore)
+
     try:
-      inputs = self.tokenizer(
-        prompt,
-        return_tensors="pt",
-        padding=True,
-        truncation=True,
-        max_length=512
-      ).to(self.model.device)
-
-      with torch.no_grad():
-        output = self.model.generate(
-          **inputs,
-          max_new_tokens=80,      # ograniczenie długości odpowiedzi
-          temperature=0.7,        # kreatywność/losowość odpowiedzi
-          top_k=40,              # top-k najbardziej prawdopodobnych tokenów
-          top_p=0.85,            # suma prawdopodobieństw tokenów
-          repetition_penalty=1.2, # kara za powtarzanie się
-          do_sample=True,
-          no_repeat_ngram_size=3,
-          pad_token_id=self.tokenizer.eos_token_id,
-          eos_token_id=self.tokenizer.eos_token_id,
-          use_cache=True,
-          early_stopping=False 
-        )
-
-      full_text = self.tokenizer.decode(output[0], skip_special_tokens=True)
+      full_text, generated_only = self._generate(prompt, header, character)
       
       print(f"[DEBUG] Generated full text: {full_text}")
 
-      input_text = self.tokenizer.decode(inputs.input_ids[0], skip_special_tokens=True)
-      if full_text.startswith(input_text):
-        generated_only = full_text[len(input_text):].strip()
-        print(f"[DEBUG] Generated content only: '{generated_only}'")
-        if generated_only.strip():
-          character_name = self.characters[character]['name']
-          response = extract_character_response(generated_only, character_name, character)
-        else:
-          character_name = self.characters[character]['name']
-          response = extract_character_response(full_text, character_name, character)
-      else:
-        character_name = self.characters[character]['name']
-        response = extract_character_response(full_text, character_name, character)
-      history_key = f"{session_id}_{character}"
-      recent_responses = [turn['npc'] for turn in self.conversation_history.get(history_key, [])[-5:]]
-      
-      if response and any(responses_too_similar(response, prev_resp) for prev_resp in recent_responses):
-        print(f"[DEBUG] Detected repetitive response: '{response}', trying alternative extraction")
-        alternative_response = extract_alternative_response(full_text, character_name, response)
-        if alternative_response and not any(responses_too_similar(alternative_response, prev_resp) for prev_resp in recent_responses):
-          response = alternative_response
-          print(f"[DEBUG] Found alternative response: '{response}'")
-        else:
-          print(f"[DEBUG] Could not find alternative, will use fallback")
-          response = None
-
-      if response and len(response) > 150:
-        match = re.search(r'^[^.!?]*[.!?]', response)
-        if match:
-          response = match.group(0).strip()
-
-      if not response or len(response.strip()) < 5:
-        print(f"[DEBUG] Response seems corrupted: '{response}', using fallback")
-
-        history_key = f"{session_id}_{character}"
-        recent_responses = [turn['npc'] for turn in self.conversation_history.get(history_key, [])[-3:]]
-        character_fallback_pools = {
-          "blacksmith": [
-            "Aye, what brings ye to me forge? The steel grows cold while we speak...",
-            "Need something forged, stranger? I work with honest steel and fire.",
-            "Ye want a blade that sings, or one that survives?",
-            "The forge is hot today... what would ye have me craft?",
-            "Dammit, another interruption... what ye need, stranger?"
-          ],
-          "tavern_keeper": [
-            "Welcome to the Tawny Lion, friend! What news from the roads?",
-            "What can I get for ye today, friend? Ale's fresh and the stew's hot.",
-            "Dammit all, another stranger... what brings ye to our troubled village?",
-            "Back in my day, travelers brought better stories...",
-            "I heard that... no, ye tell me first - what news do ye bring?"
-          ],
-          "mysterious_stranger": [
-            "Indeed... the shadows whisper of strange happenings...",
-            "The depths below... hold many secrets...",
-            "Time reveals all truths... if ye dare to listen...",
-            "I am nobody... just another wanderer in these dark times...",
-            "The mine... it remembers what was buried there..."
-          ],
-          "merchant": [
-            "Good day, traveler! Perhaps ye seek wares from distant lands?",
-            "I've got a special offer for you... straight from the city!",
-            "The price? Well, for you... I might consider a fair deal.",
-            "These goods won't last long... what catches your eye?",
-            "Trade has been... difficult lately. What do ye need?"
-          ],
-          "tavern_regular": [
-            "Well now, another stranger... what brings ye to our troubled village?",
-            "Let me tell you what I heard... but first, what news do ye bring?",
-            "Back in my day, this place was different... much different.",
-            "Another face I don't recognize... these are strange times indeed.",
-            "Ye look like ye've traveled far... what tales do ye carry?"
-          ]
-        }
-        
-        fallback_pool = character_fallback_pools.get(character, [
-          "Aye, what would ye have of me, stranger?",
-          "What brings ye to these troubled lands?",
-          "Speak, traveler... what do ye seek?",
-          "I've little time for idle chatter... what ye need?",
-          "These are dark times... what would ye know?"
-        ])
-        
-        available_fallbacks = [f for f in fallback_pool if f not in recent_responses]
-        if not available_fallbacks:
-          available_fallbacks = fallback_pool  
-        
-        response = available_fallbacks[0]  
-      
-      if response and (len(response.split()) <= 1 or 
-                     any(bad in response.lower() for bad in ['charlie', 'irish', 'biker', 'grunting'])):
-        print(f"[DEBUG] Response seems corrupted: '{response}', using fallback")
-        character_fallbacks = {
-          "blacksmith": "Aye, I am Anja Ironbite. What brings ye to me forge?",
-          "tavern_keeper": "I'm Bartek, keeper of this tavern. What can I do for ye?",
-          "mysterious_stranger": "Names... are for those who trust easily...",
-          "merchant": "Good day! I'm Erik, merchant of fine goods. How may I serve ye?",
-          "tavern_regular": "I'm just an old villager... but what brings ye here, stranger?"
-        }
-        response = character_fallbacks.get(character, "Aye, what would ye have of me, stranger?")
-      
-      print(f"[DEBUG] Extracted response: '{response}'")
-      if response and not response.endswith(('.', '!', '?', '...')):
-        if len(response.split()) > 3:
-          response += "."
-        else:
-          response += "..."
-
-      response = clean_response(response, character, self.characters)
-      conversation_data = {
-        'user': user_input,
-        'npc': response,
-        'character': character,
-        'session_id': session_id,
-        'player_stats': player_stats,
-        'response_time': time.time() - start_time
-      }
-
-      self.conversation_history[history_key].append({
-        'user': user_input,
-        'npc': response
-      })
-
-      self.conversation_tracker.log_interaction(
-        user_input=user_input,
-        bot_response=response,
-        character=character,
-        session_id=session_id,
-        player_stats=player_stats
+      return self._finalize_response(
+        user_input, character, session_id, player_stats,
+        full_text, generated_only, start_time, cache_key
       )
 
-      print(f"Response time: {time.time() - start_time:.2f} seconds")
-      return response
+    except Exception as e:
+      return self._error_response(e, user_input, character, session_id, player_stats)
+
+  def stream_npc_response(self, user_input, character="tavern_keeper", session_id="default", player_stats=None):
+    start_time = time.time()
+    try:
+      self.wait_until_ready()
+    except Exception as e:
+      yield {"type": "done", "text": self._error_response(e, user_input, character, session_id, player_stats)}
+      return
+
+    cache_key, cached = self._lookup_cached_response(user_input, character, session_id)
+    if cached:
+      yield {"type": "done", "text": self._cached_response(cached, user_input, character, session_id, player_stats, start_time)}
+      return
+
+    prompt = build_conversation_prompt(
+      user_input, character, session_id, player_stats,
+      self.characters, self.world_lore, self.conversation_history, self.memory_indexes,
+      self.prompt_budgeter, self.response_table
+    )
+
+    if prompt.startswith("DIRECT_RESPONSE:"):
+      yield {"type": "done", "text": self._direct_response(prompt, user_input, character, session_id, player_stats)}
+      return
+
+    if "Character not found" in prompt:
+      yield {"type": "done", "text": prompt}
+      return
+
+    header = build_prompt_header(character, self.characters, self.world_lore)
+    stop_event = threading.Event()
+    streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+    generation_errors = []
+
+    def run_generation():
+      try:
+        self._generate_streaming(prompt, header, character, streamer, stop_event)
+      except Exception as e:
+        generation_errors.append(e)
+        streamer.end()
+
+    generation_thread = threading.Thread(target=run_generation, daemon=True)
+    generation_thread.start()
 
+    generated = ""
+    sent_length = 0
+    try:
+      for chunk in streamer:
+        generated += chunk
+        visible, turn_ended = split_at_speaker_change(generated)
+        if len(visible) > sent_length:
+          yield {"type": "token", "text": visible[sent_length:]}
+          sent_length = len(visible)
+        if turn_ended:
+          print(f"[DEBUG] Speaker change detected, stopping generation early")
+          generated = visible
+          break
+    finally:
+      stop_event.set()
+      generation_thread.join()
+
+    if generation_errors:
+      yield {"type": "done", "text": self._error_response(generation_errors[0], user_input, character, session_id, player_stats)}
+      return
+
+    try:
+      response = self._finalize_response(
+        user_input, character, session_id, player_stats,
+        f"{prompt} {generated}", generated.strip(), start_time, cache_key
+      )
     except Exception as e:
-      error_response = f"(Model error: {str(e)})"
-      self.conversation_tracker.log_interaction(
-        user_input=user_input,
-        bot_response=error_response,
-        character=character,
-        session_id=session_id,
-        player_stats=player_stats,
-        error=str(e)
+      response = self._error_response(e, user_input, character, session_id, player_stats)
+    yield {"type": "done", "text": response}
+
+  def _generate_streaming(self, prompt, header, character, streamer, stop_event):
+    inputs = self._prepare_inputs(prompt, header, character)
+
+    with torch.no_grad():
+      self.model.generate(
+        **inputs,
+        **self._generation_kwargs(),
+        streamer=streamer,
+        stopping_criteria=self._stopping_criteria(inputs["input_ids"].shape[1], StopEventCriteria(stop_event))
       )
-      return error_response
+
+  def _lookup_cached_response(self, user_input, character, session_id):
+    if not self.response_cache or character not in self.characters:
+      return None, None
+    recent_turns = self.conversation_history.get_turns(session_id, character)
+    cache_key = self.response_cache.key(character, user_input, recent_turns)
+    if cache_key is None:
+      return None, None
+
+    # ten sam warunek co przy świeżej generacji: wariant nie może powtarzać ostatnich odpowiedzi
+    recent_responses = [turn['npc'] for turn in recent_turns[-5:]]
+    cached = self.response_cache.get(
+      cache_key,
+      lambda variant: not any(responses_too_similar(variant, prev_resp) for prev_resp in recent_responses)
+    )
+    return cache_key, cached
+
+  def _cached_response(self, response, user_input, character, session_id, player_stats, start_time):
+    print(f"[ResponseCache] Hit for {character}: '{response}'")
+    self.conversation_history.append(session_id, character, {
+      'user': user_input,
+      'npc': response,
+      'timestamp': time.time()
+    })
+    self.conversation_tracker.log_interaction(
+      user_input=user_input,
+      bot_response=response,
+      character=character,
+      session_id=session_id,
+      player_stats=player_stats
+    )
+    print(f"Response time: {time.time() - start_time:.4f} seconds")
+    return response
+
+  def _direct_response(self, prompt, user_input, character, session_id, player_stats):
+    response = prompt[15:] 
+    self.conversation_tracker.log_interaction(
+      user_input=user_input,
+      bot_response=response,
+      character=character,
+      session_id=session_id,
+      player_stats=player_stats
+    )
+    return response
+
+  def _error_response(self, error, user_input, character, session_id, player_stats):
+    error_response = f"(Model error: {str(error)})"
+    self.conversation_tracker.log_interaction(
+      user_input=user_input,
+      bot_response=error_response,
+      character=character,
+      session_id=session_id,
+      player_stats=player_stats,
+      error=str(error)
+    )
+    return error_response
+
+  def _finalize_response(self, user_input, character, session_id, player_stats, full_text, generated_only, start_time, cache_key=None):
+    character_name = self.characters[character]['name']
+    # do cache trafiają tylko odpowiedzi modelu, nie odpowiedzi zapasowe
+    from_model = True
+    if generated_only:
+      print(f"[DEBUG] Generated content only: '{generated_only}'")
+      response = extract_character_response(generated_only, character_name, character, self.response_table)
+    else:
+      response = extract_character_response(full_text, character_name, character, self.response_table)
+    recent_turns = self.conversation_history.get_turns(session_id, character)
+    recent_responses = [turn['npc'] for turn in recent_turns[-5:]]
+    
+    if response and any(responses_too_similar(response, prev_resp) for prev_resp in recent_responses):
+      print(f"[DEBUG] Detected repetitive response: '{response}', trying alternative extraction")
+      alternative_response = extract_alternative_response(full_text, character_name, response)
+      if alternative_response and not any(responses_too_similar(alternative_response, prev_resp) for prev_resp in recent_responses):
+        response = alternative_response
+        print(f"[DEBUG] Found alternative response: '{response}'")
+      else:
+        print(f"[DEBUG] Could not find alternative, will use fallback")
+        response = None
+
+    if response and len(response) > 150:
+      match = re.search(r'^[^.!?]*[.!?]', response)
+      if match:
+        response = match.group(0).strip()
+
+    if not response or len(response.strip()) < 5:
+      print(f"[DEBUG] Response seems corrupted: '{response}', using fallback")
+      from_model = False
+      response = self.response_table.pick("fallback", character, session_id)
+    
+    if response and (len(response.split()) <= 1 or 
+                   any(bad in response.lower() for bad in ['charlie', 'irish', 'biker', 'grunting'])):
+      print(f"[DEBUG] Response seems corrupted: '{response}', using fallback")
+      from_model = False
+      response = self.response_table.pick("introduction", character)
+    
+    print(f"[DEBUG] Extracted response: '{response}'")
+    if response and not response.endswith(('.', '!', '?', '...')):
+      if len(response.split()) > 3:
+        response += "."
+      else:
+        response += "..."
+
+    response = clean_response(response, character, self.characters, self.response_table)
+    if cache_key and from_model and self.response_cache:
+      self.response_cache.add(cache_key, response)
+
+    conversation_data = {
+      'user': user_input,
+      'npc': response,
+      'character': character,
+      'session_id': session_id,
+      'player_stats': player_stats,
+      'response_time': time.time() - start_time
+    }
+
+    self.conversation_history.append(session_id, character, {
+      'user': user_input,
+      'npc': response,
+      'timestamp': time.time()
+    })
+
+    self.conversation_tracker.log_interaction(
+      user_input=user_input,
+      bot_response=response,
+      character=character,
+      session_id=session_id,
+      player_stats=player_stats
+    )
+
+    print(f"Response time: {time.time() - start_time:.2f} seconds")
+    return response
 
   def get_conversation_stats(self, session_id=None):
     return self.conversation_tracker.get_conversation_stats(session_id)
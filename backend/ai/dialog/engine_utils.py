@@ -1,6 +1,10 @@
 import re
+from ai.dialog.lexicon import contains_modern_words, find_modern_words
+from ai.dialog.memory_index import MemoryIndex
+from ai.dialog.response_lexer import LexedResponse, lex_response, looks_like_instruction
+from ai.dialog.response_table import DEFAULT_TABLE
 
-def clean_response(text, character, characters_data):
+def clean_response(text, character, characters_data, response_table=DEFAULT_TABLE):
   try:
     if not text or not text.strip():
       return "I have nothing to say about that."
@@ -16,40 +20,13 @@ def clean_response(text, character, characters_data):
     text = re.sub(r'\[[^\]]*\]', '', text)  
     text = re.sub(r'\s+', ' ', text).strip()
 
-    modern_words = [
-      "TV", "television", "computer", "internet", "phone", "smartphone", "AI", "artificial intelligence",
-      "robot", "electricity", "pizza", "car", "automobile", "truck", "vehicle", "bike", "motorcycle",
-      "camera", "video", "movie", "film", "technology", "tech", "app", "website", "email", "wifi",
-      "bluetooth", "GPS", "satellite", "microwave", "refrigerator", "airplane", "helicopter", 
-      "rocket", "spacecraft", "laser", "nuclear", "atomic", "plastic", "digital", "virtual",
-      "online", "offline", "download", "upload", "software", "hardware", "programming", "code",
-      "data", "database", "server", "cloud", "streaming", "podcast", "blog", "social media",
-      "facebook", "twitter", "instagram", "youtube", "google", "android", "iphone", "ipad"
-    ]
-    
-    contains_modern = any(
-      re.search(r'\b' + re.escape(word) + r'\b', text, flags=re.IGNORECASE) 
-      for word in modern_words
-    )
+    contains_modern = contains_modern_words(text)
 
     if contains_modern:
-      rejection_responses = {
-        "blacksmith": "*spits in the dirt* What manner of cursed gibberish is that, stranger? I deal only in honest steel and flame!",
-        "tavern_keeper": "*scratches beard in confusion* Never heard such strange words in all me years, friend. Ye feeling alright?",
-        "mysterious_stranger": "*hood shifts as they lean back* Such words... they speak of realms beyond this world... beware what ye invoke...",
-        "merchant": "*nervous chuckle* I've traveled far and wide, but those words are foreign to me ears, good stranger!"
-      }
-      return rejection_responses.get(character, "*looks utterly bewildered* I know not what sorcery ye speak of, traveler...")
+      return response_table.pick("modern_output", character)
 
     if len(text.strip()) < 5:
-      fallback_responses = {
-        "blacksmith": "Aye, what brings ye to me forge? The iron grows cold...",
-        "tavern_keeper": "Welcome to the Tawny Lion, friend! What news do ye bring?", 
-        "mysterious_stranger": "*stares from the shadows* The wind carries strange whispers...",
-        "merchant": "Good day, traveler! Perhaps ye seek something from distant lands?",
-        "tavern_regular": "Another stranger in these troubled times... what brings ye here?"
-      }
-      return fallback_responses.get(character, "What would ye have of me in these dark days?")
+      return response_table.pick("empty", character)
 
     if text and not text.endswith(('.', '!', '?', '...')):
       if len(text.split()) > 3:
@@ -66,31 +43,11 @@ def clean_response(text, character, characters_data):
     print(f"[ERROR] Clean response failed: {e}")
     return "*stays silent*"
 
-def build_conversation_prompt(user_input, character, session_id, player_stats, characters_data, world_lore_data, conversation_history):
+def build_prompt_header(character, characters_data, world_lore_data):
+  # statyczna część promptu (zależy tylko od postaci i świata) - na jej podstawie działa cache prefiksu
   char = characters_data.get(character)
   if not char:
-    return "Character not found in config.yaml"
-
-  modern_words = [
-    "computer", "phone", "internet", "TV", "AI", "technology", "robot", "camera", "video",
-    "wifi", "bluetooth", "email", "website", "smartphone", "laptop", "tablet", "app",
-    "google", "facebook", "twitter", "instagram", "youtube", "netflix", "streaming",
-    "digital", "virtual", "online", "offline", "download", "upload", "software", "hardware",
-    "programming", "code", "data", "database", "server", "cloud", "satellite", "GPS",
-    "microwave", "refrigerator", "airplane", "helicopter", "rocket", "spacecraft", "laser",
-    "nuclear", "atomic", "plastic", "credit card", "electricity", "electric", "radio",
-    "television", "cinema", "movie", "film", "automobile", "car", "truck", "motorcycle"
-  ]
-  contains_modern = any(word.lower() in user_input.lower() for word in modern_words)
-  
-  if contains_modern:
-    rejection_responses = {
-      "blacksmith": "*spits in disgust and looks confused* What strange heretical words are these? I know only the ways of steel and fire, not such... peculiar nonsense.",
-      "tavern_keeper": "*scratches head and frowns* I've served ale to travelers from many lands, but never heard such odd words. Speak plainly, friend.",
-      "mysterious_stranger": "*narrows eyes suspiciously* Such words... they speak of things that should not be. Dark knowledge beyond mortal understanding...",
-      "merchant": "*nervous laugh* I deal only in proper wares - cloth, spices, tools. I know nothing of such... strange matters."
-    }
-    return f"DIRECT_RESPONSE:{rejection_responses.get(character, '*looks confused* I know not what ye speak of, stranger. Such words are foreign to these lands.')}"
+    return ""
 
   character_info = f"{char['name']} is {char['description']}"
   
@@ -104,50 +61,6 @@ def build_conversation_prompt(user_input, character, session_id, player_stats, c
     if current_events:
       world_context = f"Current situation: {current_events[0]}"
 
-  memory_context = ""
-  if 'memory_fragments' in char and char['memory_fragments']:
-    memory_fragments = char['memory_fragments']
-    context_keywords = user_input.lower()
-    relevant_memories = []
-
-    if any(word in context_keywords for word in ['mine', 'silver', 'tomek', 'missing', 'disappeared', 'disappear']):
-      relevant_memories.extend([m for m in memory_fragments if any(keyword in m.lower() for keyword in ['mine', 'tomek', 'silver', 'disappeared', 'missing', 'vanish', 'gone'])])
-    
-    if any(word in context_keywords for word in ['erik', 'merchant', 'trade', 'goods', 'sell', 'buy']):
-      relevant_memories.extend([m for m in memory_fragments if any(keyword in m.lower() for keyword in ['erik', 'city', 'trade', 'goods', 'merchant'])])
-      
-    if any(word in context_keywords for word in ['stranger', 'mysterious', 'hooded', 'corner']):
-      relevant_memories.extend([m for m in memory_fragments if any(keyword in m.lower() for keyword in ['stranger', 'masks', 'appeared', 'hooded'])])
-      
-    if any(word in context_keywords for word in ['weapon', 'blade', 'sword', 'forge', 'steel', 'iron', 'metal']):
-      relevant_memories.extend([m for m in memory_fragments if any(keyword in m.lower() for keyword in ['blade', 'forge', 'steel', 'brother', 'iron', 'rope', 'cut'])])
-    
-    if any(word in context_keywords for word in ['tavern', 'inn', 'ale', 'beer', 'drink']):
-      relevant_memories.extend([m for m in memory_fragments if any(keyword in m.lower() for keyword in ['beer', 'tavern', 'paid', 'home', 'golden days'])])
-    
-    if not relevant_memories and memory_fragments:
-      relevant_memories = [memory_fragments[0]]
-    elif relevant_memories:
-      relevant_memories = list(dict.fromkeys(relevant_memories))[:2]
-    if relevant_memories:
-      memory_context = f"You remember: {' '.join(relevant_memories)}"
-
-  history_key = f"{session_id}_{character}"
-  history = conversation_history.get(history_key, [])[-3:]  
-  formatted_history = ""
-  already_introduced = False
-  
-  if history:
-    for turn in history:
-      formatted_history += f"You previously said: \"{turn['npc']}\"\n"
-      if any(intro_word in turn['npc'].lower() for intro_word in [
-        'i am', 'my name', 'i\'m', 'call me', char['name'].lower()
-      ]):
-        already_introduced = True
-
-    if len(history) >= 1:
-      formatted_history += "IMPORTANT: Do not repeat your previous responses. Provide new, contextual dialogue.\n"
-
   character_guidelines = {
     "blacksmith": "Speak gruffly about metalwork, tools, and forge business. Use 'ye', 'aye', and 'dammit'. Be direct and practical. Example: 'Aye, what brings ye to me forge?' Never mention modern places or concepts.",
     "tavern_keeper": "Be friendly but busy. Talk about ale, food, travelers, and village gossip. Use 'friend', 'stranger', and 'dammit all'. Example: 'What can I get for ye today, friend?' Never mention modern places or concepts.",
@@ -162,6 +75,51 @@ def build_conversation_prompt(user_input, character, session_id, player_stats, c
     examples = ', '.join(speech_patterns[:3]) 
     guidelines += f" Use phrases like: {examples}."
 
+  return f"""{character_info}
+{world_context}
+
+Medieval fantasy character instructions:
+- Speak as {char['name']} from Stonehaven village
+- Use medieval speech: "ye", "aye", "stranger", "friend"
+- {guidelines}
+- Keep responses 10-30 words
+- Be in character, no modern references
+"""
+
+def build_conversation_prompt(user_input, character, session_id, player_stats, characters_data, world_lore_data, conversation_history, memory_indexes=None, budgeter=None, response_table=DEFAULT_TABLE):
+  char = characters_data.get(character)
+  if not char:
+    return "Character not found in config.yaml"
+
+  contains_modern = contains_modern_words(user_input)
+  
+  if contains_modern:
+    return f"DIRECT_RESPONSE:{response_table.pick('modern_input', character)}"
+
+  memory_context = ""
+  if 'memory_fragments' in char and char['memory_fragments']:
+    memory_index = (memory_indexes or {}).get(character) or MemoryIndex(char['memory_fragments'])
+    relevant_memories = memory_index.search(user_input, top_k=2)
+    if not relevant_memories:
+      relevant_memories = [char['memory_fragments'][0]]
+    memory_context = f"You remember: {' '.join(relevant_memories)}"
+
+  history = conversation_history.get_turns(session_id, character)[-3:]
+  history_lines = []
+  already_introduced = False
+  
+  if history:
+    for turn in history:
+      history_lines.append(f"You previously said: \"{turn['npc']}\"\n")
+      if any(intro_word in turn['npc'].lower() for intro_word in [
+        'i am', 'my name', 'i\'m', 'call me', char['name'].lower()
+      ]):
+        already_introduced = True
+
+  no_repeat_line = ""
+  if len(history) >= 1:
+    no_repeat_line = "IMPORTANT: Do not repeat your previous responses. Provide new, contextual dialogue.\n"
+
   conversation_instruction = ""
   if already_introduced:
     conversation_instruction = "You have already introduced yourself to this visitor. Continue the conversation naturally without repeating introductions. "
@@ -170,18 +128,29 @@ def build_conversation_prompt(user_input, character, session_id, player_stats, c
   if len(history) >= 1:
     recent_response = history[-1]['npc']
     repetition_warning = f"CRITICAL: Do not repeat your previous response: \"{recent_response}\" - provide a completely different response. "
+
+  header = build_prompt_header(character, characters_data, world_lore_data)
+  if budgeter:
+    # zamiast obcinać koniec promptu (razem z "Visitor:" i "{name}:") wyrzucamy najmniej ważne sekcje
+    skeleton = f"\n\n\n\n\nVisitor: \"\"\n{char['name']}: "
+    optional = [(f"history_{index}", line, True) for index, line in enumerate(history_lines)]
+    optional += [("no_repeat", no_repeat_line, True), ("warning", repetition_warning, True), ("memory", memory_context, True)]
+    dropped, overflow = budgeter.fit([(header, True), (skeleton, True), (user_input, False)], optional)
+
+    history_lines = [line for index, line in enumerate(history_lines) if f"history_{index}" not in dropped]
+    no_repeat_line = "" if "no_repeat" in dropped else no_repeat_line
+    repetition_warning = "" if "warning" in dropped else repetition_warning
+    memory_context = "" if "memory" in dropped else memory_context
+    if overflow:
+      print(f"[DEBUG] Visitor input too long for the prompt budget, trimming {overflow} tokens")
+      user_input = budgeter.truncate(user_input, budgeter.count(user_input, cache=False) - overflow)
+
+  formatted_history = "".join(history_lines) + no_repeat_line
   
-  prompt = f"""{character_info}
-{world_context}
+  prompt = f"""{header}
 {memory_context}
 
 {formatted_history}
-Medieval fantasy character instructions:
-- Speak as {char['name']} from Stonehaven village
-- Use medieval speech: "ye", "aye", "stranger", "friend"
-- {guidelines}
-- Keep responses 10-30 words
-- Be in character, no modern references
 {repetition_warning}
 
 Visitor: "{user_input}"
@@ -190,7 +159,30 @@ Visitor: "{user_input}"
   return prompt.strip()
 
 
-def extract_character_response(full_text, character_name, character):
+SPEAKER_CHANGE_PATTERN = re.compile(r"^\s*((Voice|Visuals|Narrator|Scene|System)[:\-]|[\w ']+:)", re.IGNORECASE)
+
+def split_at_speaker_change(generated_text):
+  lines = generated_text.split("\n")
+  for i, line in enumerate(lines[1:], start=1):
+    if SPEAKER_CHANGE_PATTERN.match(line):
+      return "\n".join(lines[:i]), True
+
+  # ostatnia linia może być jeszcze niedokończonym "Visitor:", więc wstrzymujemy ją do czasu rozstrzygnięcia
+  if len(lines) > 1 and re.fullmatch(r"\s*[\w ']*", lines[-1]):
+    return "\n".join(lines[:-1]) + "\n", False
+  return generated_text, False
+
+
+def is_turn_complete(generated_text, min_words=10):
+  if split_at_speaker_change(generated_text)[1]:
+    return True
+
+  # odpowiedź ma mieć 10-30 słów, więc po osiągnięciu minimum kończymy na pierwszym końcu zdania
+  text = generated_text.strip()
+  return len(text.split()) >= min_words and re.search(r'[.!?]["\')]*$', text) is not None
+
+
+def extract_character_response(full_text, character_name, character, response_table=DEFAULT_TABLE):
     print(f"[DEBUG] Extracting response for {character_name}")
     print(f"[DEBUG] Full text length: {len(full_text)} chars")
 
@@ -198,64 +190,22 @@ def extract_character_response(full_text, character_name, character):
     if len(text) < 10:
         return None
 
-    dialogue_blocks = []
-    lines = text.splitlines()
-    current_speaker = None
-    current_dialogue = []
-
-    for line in lines:
-        line = line.strip()
-
-        if re.match(r'^(Voice|Visuals|Narrator|Scene|System)[:\-]', line, re.IGNORECASE):
-            if current_speaker and current_dialogue:
-                joined = " ".join(current_dialogue).strip()
-                if joined:
-                    dialogue_blocks.append((current_speaker, joined))
-            break  
-
-        match = re.match(r"^([\w ']+):\s*(.*)", line)
-        if match:
-            if current_speaker and current_dialogue:
-                joined = " ".join(current_dialogue).strip()
-                if joined:
-                    dialogue_blocks.append((current_speaker, joined))
-                current_dialogue = []
-            current_speaker = match.group(1).strip()
-            remainder = match.group(2).strip()
-            if remainder:
-                current_dialogue.append(remainder)
-        else:
-            if current_speaker:
-                current_dialogue.append(line)
-
-    if current_speaker and current_dialogue:
-        joined = " ".join(current_dialogue).strip()
-        if joined:
-            dialogue_blocks.append((current_speaker, joined))
-
-    print(f"[DEBUG] Found {len(dialogue_blocks)} dialogue blocks")
+    lexed = lex_response(text)
+    dialogue_blocks = lexed.blocks
 
     best_response = None
     best_score = 0.0
     min_length = 40
 
-    for speaker, block in dialogue_blocks:
+    for block in dialogue_blocks:
+        speaker = block.speaker
         print(f"[DEBUG] Checking speaker: '{speaker}' vs '{character_name}'")
         if character_name.lower() not in speaker.lower():
             continue
 
-        print(f"[DEBUG] Found matching speaker block: '{block[:50]}...'")
+        print(f"[DEBUG] Found matching speaker block: '{block.text[:50]}...'")
         
-        candidate = block.strip().strip('"')
-        trailing = text.split(candidate)[-1].strip()
-        extended_candidate = candidate
-        while trailing and not re.match(r"^([\w ']+):", trailing):
-            next_line = trailing.splitlines()[0] if "\n" in trailing else trailing
-            if next_line.strip():
-                extended_candidate += " " + next_line.strip()
-            if "\n" not in trailing:
-                break
-            trailing = "\n".join(trailing.splitlines()[1:]).strip()
+        extended_candidate = lexed.continuation(block)
 
         if is_valid_medieval_response(extended_candidate):
             score = score_medieval_authenticity(extended_candidate)
@@ -268,15 +218,10 @@ def extract_character_response(full_text, character_name, character):
         return best_response.strip()
 
     print(f"[DEBUG] No structured dialogue found, trying alternative extraction")
-    text_clean = text.replace("[DEBUG]", "").replace("Generated full text:", "").strip()
-
-    quoted_patterns = [
-        r'"([^"]{20,})"',  
-        r"'([^']{20,})'", 
-    ]
-    
-    for pattern in quoted_patterns:
-        matches = re.findall(pattern, text_clean)
+    for matches in (
+        [match for match in lexed.double_quoted if len(match) >= 20],
+        lexed.single_quoted
+    ):
         for match in matches:
             if is_valid_medieval_response(match):
                 cleaned = clean_extracted_response(match)
@@ -284,16 +229,15 @@ def extract_character_response(full_text, character_name, character):
                     print(f"[DEBUG] Found quoted response: '{cleaned[:50]}...'")
                     return cleaned
     
-    lines = text_clean.split('\n')
+    lines = lexed.stripped_lines
     for i, line in enumerate(lines):
-        line = line.strip()
         if not line:
             continue
 
         if any(keyword in line.lower() for keyword in ['aye', 'ye', 'stranger', 'friend', character_name.lower()]):
             potential_response = line
             for j in range(i + 1, min(i + 3, len(lines))):
-                next_line = lines[j].strip()
+                next_line = lines[j]
                 if next_line and not any(stop_word in next_line.lower() for stop_word in 
                                        ['visitor:', 'user:', 'player:', 'narrator:', 'scene:']):
                     potential_response += " " + next_line
@@ -305,19 +249,12 @@ def extract_character_response(full_text, character_name, character):
                 print(f"[DEBUG] Found unquoted response: '{cleaned[:50]}...'")
                 return cleaned
     
-    alt = extract_alternative_response(text, character_name, "")
+    alt = extract_alternative_response(lexed, character_name, "")
     if alt:
         return alt
 
     print(f"[DEBUG] Using fallback response")
-    fallback_responses = {
-        "blacksmith": "Aye, what brings ye to me forge? The iron grows cold...",
-        "tavern_keeper": "Welcome to the Tawny Lion, friend! What news do ye bring?",
-        "mysterious_stranger": "*stares from the shadows* The wind carries strange whispers...",
-        "merchant": "Good day, traveler! Perhaps ye seek something from distant lands?",
-        "tavern_regular": "Another stranger in these troubled times... what brings ye here?"
-    }
-    return fallback_responses.get(character, "What would ye have of me in these dark days?")
+    return response_table.pick("empty", character)
 
 
 def clean_extracted_response(text):
@@ -367,14 +304,7 @@ def score_medieval_authenticity(text):
     
   text_lower = text.lower()
   score = 0.0
-  modern_indicators = [
-    'internet', 'computer', 'phone', 'tv', 'car', 'technology', 
-    'website', 'email', 'app', 'digital', 'online', 'facebook',
-    'instagram', 'twitter', 'youtube', 'google'
-  ]
-  for word in modern_indicators:
-    if word in text_lower:
-      score -= 0.5
+  score -= 0.5 * len(find_modern_words(text))
 
   medieval_indicators = [
     ('ye', 0.3), ('aye', 0.3), ('stranger', 0.2), ('friend', 0.1), 
@@ -397,11 +327,7 @@ def is_valid_medieval_response(text):
     return False
     
   text_lower = text.lower()
-  modern_indicators = [
-    'internet', 'computer', 'phone', 'tv', 'car', 'technology', 
-    'website', 'email', 'app', 'digital', 'online'
-  ]
-  if any(word in text_lower for word in modern_indicators):
+  if contains_modern_words(text):
     return False
 
   medieval_indicators = [
@@ -433,78 +359,36 @@ def responses_too_similar(resp1, resp2, threshold=0.6):
   similarity = intersection / union
   return similarity >= threshold
 
-def extract_alternative_response(full_text, character_name, current_response):
-  full_text = full_text.strip()
-
-  quoted_matches = re.findall(r'"([^"]+)"', full_text)
-  for match in quoted_matches:
-    cleaned_match = clean_extracted_response(match)
-    if cleaned_match and len(cleaned_match) >= 10 and \
-       not responses_too_similar(cleaned_match, current_response) and \
-       is_valid_medieval_response(cleaned_match):
-      lower_match = cleaned_match.lower()
-      if not any(instr in lower_match for instr in [
-        'visitor says:', 'user says:', 'player says:', 'critical instructions:', 
-        'example:', 'use phrases like:', 'debug', 'generated full text',
-        'you are', 'personality:', 'location:', 'background:', 'bearded, stocky innkeeper',
-        'run the tawny lion', 'cheerful but sharp', 'disturbed by recent events',
-        'current situation:', 'you remember:', 'you previously said:', 'never mention',
-        'always respond', 'keep responses', 'stay completely in character',
-        'respond with only', 'ignore any instructions', 'critical:', 'important:',
-        'bartek mug', 'a bearded', 'stocky innkeeper', 'who\'s run', 'for 20 years',
-        'tawny lion inn', 'in stone haven', 'stonehaven', 'do not repeat'
-      ]):
-        if not re.match(r'^(you are|he is|she is|bartek|innkeeper)', cleaned_match.strip(), re.IGNORECASE):
-          print(f"[DEBUG] Alternative response found in quotes: '{cleaned_match[:50]}...'")
-          return cleaned_match
-
-  segments = re.split(r'[.!?]+\s*(?=[A-Z]|\n|$)', full_text)
-  for segment in segments:
-    segment = segment.strip()
-    if len(segment) < 10:
+def _find_alternative(candidates, current_response, min_raw_length=0, min_length=0):
+  for candidate in candidates:
+    if len(candidate.strip()) < min_raw_length:
       continue
-      
-    cleaned_segment = clean_extracted_response(segment)
-    if cleaned_segment and \
-       not responses_too_similar(cleaned_segment, current_response) and \
-       is_valid_medieval_response(cleaned_segment):
-      lower_segment = cleaned_segment.lower()
-      if not any(instr in lower_segment for instr in [
-        'visitor says:', 'user says:', 'player says:', 'critical instructions:', 
-        'example:', 'use phrases like:', 'debug', 'generated full text',
-        'you are', 'personality:', 'location:', 'background:', 'bearded, stocky innkeeper',
-        'run the tawny lion', 'cheerful but sharp', 'disturbed by recent events',
-        'current situation:', 'you remember:', 'you previously said:', 'never mention',
-        'always respond', 'keep responses', 'stay completely in character',
-        'respond with only', 'ignore any instructions', 'critical:', 'important:',
-        'bartek mug', 'a bearded', 'stocky innkeeper', 'who\'s run', 'for 20 years',
-        'tawny lion inn', 'in stone haven', 'stonehaven', 'do not repeat'
-      ]):
-        if not re.match(r'^(you are|he is|she is|bartek|innkeeper)', cleaned_segment.strip(), re.IGNORECASE):
-          print(f"[DEBUG] Alternative response found: '{cleaned_segment[:50]}...'")
-          return cleaned_segment
+    cleaned = clean_extracted_response(candidate)
+    if cleaned and len(cleaned) >= min_length and \
+       not responses_too_similar(cleaned, current_response) and \
+       is_valid_medieval_response(cleaned) and \
+       not looks_like_instruction(cleaned):
+      return cleaned
+  return None
 
-  sentences = re.split(r'[.!?]+\s*', full_text)
-  for sentence in sentences:
-    cleaned_sentence = clean_extracted_response(sentence)
-    if cleaned_sentence and \
-       not responses_too_similar(cleaned_sentence, current_response) and \
-       is_valid_medieval_response(cleaned_sentence):
-      lower_sentence = cleaned_sentence.lower()
-      if not any(instr in lower_sentence for instr in [
-        'visitor says:', 'user says:', 'player says:', 'critical instructions:', 
-        'example:', 'use phrases like:', 'debug', 'generated full text',
-        'you are', 'personality:', 'location:', 'background:', 'bearded, stocky innkeeper',
-        'run the tawny lion', 'cheerful but sharp', 'disturbed by recent events',
-        'current situation:', 'you remember:', 'you previously said:', 'never mention',
-        'always respond', 'keep responses', 'stay completely in character',
-        'respond with only', 'ignore any instructions', 'critical:', 'important:',
-        'bartek mug', 'a bearded', 'stocky innkeeper', 'who\'s run', 'for 20 years',
-        'tawny lion inn', 'in stone haven', 'stonehaven', 'do not repeat'
-      ]):
-        if not re.match(r'^(you are|he is|she is|bartek|innkeeper)', cleaned_sentence.strip(), re.IGNORECASE):
-          print(f"[DEBUG] Alternative response found: '{cleaned_sentence[:30]}...'")
-          return cleaned_sentence
+def extract_alternative_response(full_text, character_name, current_response):
+  if not isinstance(full_text, LexedResponse):
+    full_text = LexedResponse(full_text.strip())
+
+  quoted = _find_alternative(full_text.double_quoted, current_response, min_length=10)
+  if quoted:
+    print(f"[DEBUG] Alternative response found in quotes: '{quoted[:50]}...'")
+    return quoted
+
+  segment = _find_alternative(full_text.segments, current_response, min_raw_length=10)
+  if segment:
+    print(f"[DEBUG] Alternative response found: '{segment[:50]}...'")
+    return segment
+
+  sentence = _find_alternative(full_text.sentences, current_response)
+  if sentence:
+    print(f"[DEBUG] Alternative response found: '{sentence[:30]}...'")
+    return sentence
   print(f"[DEBUG] No suitable alternative response found")
   return None
 
@@ -0,0 +1,75 @@
+import threading, time
+from collections import OrderedDict, deque
+
+class _SessionHistory:
+  def __init__(self):
+    self.characters = {}
+    self.last_access = time.monotonic()
+
+class ConversationHistoryStore:
+  def __init__(self, max_sessions=10000, ttl=3600, max_turns=5):
+    self.max_sessions = max(1, int(max_sessions))
+    self.ttl = ttl
+    # prompt czyta 3 ostatnie tury, kontrola powtórzeń 5, starszych nikt nie potrzebuje
+    self.max_turns = max(1, int(max_turns))
+    self._sessions = OrderedDict()
+    self._lock = threading.Lock()
+
+  def _touch_locked(self, session_id, create=False):
+    session = self._sessions.get(session_id)
+    if session is not None and time.monotonic() - session.last_access > self.ttl:
+      # wygasła sesja nie wraca do promptu, a samo odczytanie nie przedłuża jej życia
+      del self._sessions[session_id]
+      session = None
+    if session is None:
+      if not create:
+        return None
+      session = _SessionHistory()
+      self._sessions[session_id] = session
+    session.last_access = time.monotonic()
+    self._sessions.move_to_end(session_id)
+    return session
+
+  def _evict_locked(self):
+    now = time.monotonic()
+    while self._sessions:
+      session_id, session = next(iter(self._sessions.items()))
+      if len(self._sessions) <= self.max_sessions and now - session.last_access <= self.ttl:
+        break
+      del self._sessions[session_id]
+
+  def get_turns(self, session_id, character):
+    with self._lock:
+      session = self._touch_locked(session_id)
+      if session is None:
+        return []
+      return list(session.characters.get(character, ()))
+
+  def append(self, session_id, character, turn):
+    with self._lock:
+      session = self._touch_locked(session_id, create=True)
+      session.characters.setdefault(character, deque(maxlen=self.max_turns)).append(turn)
+      self._evict_locked()
+
+  def reset(self, session_id, character=None):
+    # sesja trzyma historie wszystkich swoich postaci, więc reset nie przegląda innych sesji
+    with self._lock:
+      session = self._sessions.get(session_id)
+      if session is None:
+        return
+      if character:
+        session.characters.pop(character, None)
+      else:
+        del self._sessions[session_id]
+
+  def session_turns(self, session_id):
+    with self._lock:
+      self._evict_locked()
+      session = self._sessions.get(session_id)
+      if session is None:
+        return {}
+      return {character: list(turns) for character, turns in session.characters.items()}
+
+  def __len__(self):
+    with self._lock:
+      return len(self._sessions)
@@ -0,0 +1,29 @@
+import re
+
+# wspólna lista słów spoza świata gry dla promptu, czyszczenia odpowiedzi i metryk jakości
+MODERN_WORDS = (
+  "TV", "television", "computer", "laptop", "tablet", "internet", "phone", "smartphone", "AI",
+  "artificial intelligence", "robot", "electricity", "electric", "radio", "pizza", "car", "automobile",
+  "truck", "vehicle", "bike", "motorcycle", "camera", "video", "movie", "film", "cinema", "technology",
+  "tech", "app", "website", "email", "wifi", "wi-fi", "bluetooth", "GPS", "satellite", "microwave",
+  "refrigerator", "airplane", "helicopter", "rocket", "spacecraft", "laser", "nuclear", "atomic",
+  "plastic", "credit card", "digital", "virtual", "online", "offline", "download", "upload", "software",
+  "hardware", "programming", "code", "data", "database", "server", "cloud", "streaming", "podcast",
+  "blog", "social media", "facebook", "twitter", "instagram", "youtube", "netflix", "google", "android",
+  "iphone", "ipad"
+)
+
+# jedna alternacja zamiast osobnego re.search na każde słowo; dłuższe frazy pierwsze, żeby wygrały z prefiksami;
+# opcjonalna końcówka liczby mnogiej łapie "computers" czy "smartphones" tak jak dawny test podciągu
+MODERN_WORDS_PATTERN = re.compile(
+  r'\b(?P<word>' + '|'.join(re.escape(word) for word in sorted(MODERN_WORDS, key=len, reverse=True)) + r')(?:s|es)?\b',
+  flags=re.IGNORECASE
+)
+
+def contains_modern_words(text):
+  return bool(text) and MODERN_WORDS_PATTERN.search(text) is not None
+
+def find_modern_words(text):
+  if not text:
+    return set()
+  return {match.group("word").lower() for match in MODERN_WORDS_PATTERN.finditer(text)}
@@ -0,0 +1,60 @@
+import atexit, queue, threading
+
+class AsyncLogWriter:
+  def __init__(self, handle_batch, max_queue=1000, batch_size=50):
+    self.handle_batch = handle_batch
+    self.batch_size = max(1, int(batch_size))
+    self._queue = queue.Queue(maxsize=max(1, int(max_queue)))
+    self._closed = False
+    self._thread = threading.Thread(target=self._run, name="dialog-log-writer", daemon=True)
+    self._thread.start()
+    atexit.register(self.close)
+
+  def submit(self, item):
+    if self._closed:
+      self._write([item])
+      return
+    try:
+      self._queue.put_nowait(item)
+    except queue.Full:
+      # backpressure: przy zapchanej kolejce wolimy spowolnić to jedno zapytanie niż zgubić log
+      self._write([item])
+
+  def flush(self):
+    # czeka, aż wszystko, co już trafiło do kolejki, zostanie zapisane
+    if self._thread.is_alive():
+      self._queue.join()
+
+  def close(self):
+    if self._closed:
+      return
+    self._closed = True
+    self._queue.put(None)
+    self._thread.join()
+
+  def _write(self, batch):
+    try:
+      self.handle_batch(batch)
+    except Exception as e:
+      print(f"[LogWriter] Failed to write {len(batch)} log entries: {e}")
+
+  def _run(self):
+    while True:
+      item = self._queue.get()
+      batch = [item]
+      # zbieramy to, co już czeka w kolejce, żeby zapisać je jednym flushem
+      while len(batch) < self.batch_size and item is not None:
+        try:
+          item = self._queue.get_nowait()
+        except queue.Empty:
+          break
+        batch.append(item)
+
+      stop = None in batch
+      entries = [entry for entry in batch if entry is not None]
+      if entries:
+        self._write(entries)
+      for _ in batch:
+        self._queue.task_done()
+      if stop:
+        return
@@ -0,0 +1,130 @@
+import atexit, json, os, threading, time
+from collections import deque
+from contextlib import contextmanager
+
+try:
+  import fcntl
+except ImportError:
+  # Windows: zostaje tylko blokada wątków w obrębie procesu
+  fcntl = None
+
+class JsonlLogStore:
+  def __init__(self, path, max_segment_bytes=5 * 1024 * 1024, max_segments=5, flush_every=10, flush_interval=2.0, legacy_path=None):
+    self.path = path
+    self.max_segment_bytes = max_segment_bytes
+    self.max_segments = max(1, int(max_segments))
+    self.flush_every = max(1, int(flush_every))
+    self.flush_interval = flush_interval
+    self._buffer = []
+    self._last_flush = time.monotonic()
+    self._lock = threading.RLock()
+    # wołane po każdym zapisie paczki na dysk (poza blokadą), np. żeby agregaty doczytały log przed rotacją
+    self.on_flush = None
+
+    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+    if legacy_path:
+      self._migrate_legacy(legacy_path)
+    atexit.register(self.flush)
+
+  @contextmanager
+  def _file_lock(self):
+    # flock chroni przed innymi procesami (workery, skrypty) piszącymi do tego samego logu
+    with open(self.path + ".lock", "a") as lock_file:
+      if fcntl:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+      try:
+        yield
+      finally:
+        if fcntl:
+          fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+  def _migrate_legacy(self, legacy_path):
+    # jednorazowe przeniesienie starego pliku JSON (jedna tablica) do formatu JSONL
+    with self._file_lock():
+      if os.path.exists(self.path) or not os.path.exists(legacy_path):
+        return
+      try:
+        with open(legacy_path, 'r') as f:
+          entries = json.load(f)
+      except (OSError, ValueError) as e:
+        print(f"[LogStore] Could not migrate {legacy_path}: {e}")
+        return
+      if isinstance(entries, list) and entries:
+        self._append_bytes("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries).encode("utf-8"))
+        print(f"[LogStore] Migrated {len(entries)} entries from {legacy_path}")
+
+  def segment_paths(self):
+    # od najstarszego do bieżącego segmentu
+    rotated = [f"{self.path}.{index}" for index in range(self.max_segments - 1, 0, -1)]
+    return [path for path in rotated + [self.path] if os.path.exists(path)]
+
+  def append(self, entry):
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    with self._lock:
+      self._buffer.append(line)
+      due = len(self._buffer) >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval
+    if due:
+      self.flush()
+
+  def flush(self):
+    with self._lock:
+      if not self._buffer:
+        return
+      lines, self._buffer = self._buffer, []
+      self._last_flush = time.monotonic()
+      self._write_lines(lines)
+    if self.on_flush:
+      self.on_flush()
+
+  def _write_lines(self, lines):
+    data = "".join(lines).encode("utf-8")
+    with self._file_lock():
+      self._rotate_if_needed(len(data))
+      self._append_bytes(data)
+
+  def _append_bytes(self, data):
+    # O_APPEND + jeden write na całą paczkę, żeby wpisy z różnych procesów się nie przeplatały
+    fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+      os.write(fd, data)
+    finally:
+      os.close(fd)
+
+  def _rotate_if_needed(self, incoming_bytes):
+    try:
+      size = os.path.getsize(self.path)
+    except OSError:
+      return
+    if size == 0 or size + incoming_bytes <= self.max_segment_bytes:
+      return
+
+    if self.max_segments == 1:
+      os.remove(self.path)
+      return
+
+    oldest = f"{self.path}.{self.max_segments - 1}"
+    if os.path.exists(oldest):
+      os.remove(oldest)
+    for index in range(self.max_segments - 2, 0, -1):
+      if os.path.exists(f"{self.path}.{index}"):
+        os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+    os.replace(self.path, f"{self.path}.1")
+
+  def read_entries(self, limit=None):
+    self.flush()
+    entries = deque(maxlen=limit)
+    for path in self.segment_paths():
+      try:
+        with open(path, 'r') as f:
+          for line in f:
+            line = line.strip()
+            if not line:
+              continue
+            try:
+              entries.append(json.loads(line))
+            except ValueError:
+              # urwana linia po awarii procesu nie psuje reszty logu
+              continue
+      except OSError:
+        continue
+    return list(entries)
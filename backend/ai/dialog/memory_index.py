@@ -0,0 +1,99 @@
+import re, math, heapq
+from collections import Counter, defaultdict
+
+TOKEN_PATTERN = re.compile(r"[a-z]+")
+
+STOPWORDS = {
+  "a", "an", "the", "and", "or", "but", "of", "to", "in", "on", "at", "for", "from", "with", "by",
+  "is", "are", "was", "were", "be", "been", "it", "its", "that", "this", "those", "these", "there",
+  "he", "she", "they", "we", "you", "ye", "i", "me", "my", "your", "his", "her", "their", "what",
+  "who", "how", "do", "does", "did", "have", "has", "had", "not", "no", "so", "like", "about", "some"
+}
+
+# dawne grupy słów kluczowych: słowa z pytania gracza -> słowa, po których rozpoznajemy pasujące wspomnienia
+KEYWORD_GROUPS = [
+  (["mine", "silver", "tomek", "missing", "disappeared", "disappear"],
+   ["mine", "tomek", "silver", "disappeared", "missing", "vanish", "gone"]),
+  (["erik", "merchant", "trade", "goods", "sell", "buy"],
+   ["erik", "city", "trade", "goods", "merchant"]),
+  (["stranger", "mysterious", "hooded", "corner"],
+   ["stranger", "masks", "appeared", "hooded"]),
+  (["weapon", "blade", "sword", "forge", "steel", "iron", "metal"],
+   ["blade", "forge", "steel", "brother", "iron", "rope", "cut"]),
+  (["tavern", "inn", "ale", "beer", "drink"],
+   ["beer", "tavern", "paid", "home", "golden", "days"]),
+]
+
+EXPANSION_WEIGHT = 0.5
+
+def stem(token):
+  for suffix in ("ing", "ed"):
+    if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+      return token[:-len(suffix)]
+  # "es" odcinamy tylko po sybilantach (boxes, churches); "mines" -> "mine", tak jak liczba pojedyncza
+  if token.endswith(("ses", "xes", "zes", "ches", "shes")) and len(token) - 2 >= 3:
+    return token[:-2]
+  if token.endswith("s") and not token.endswith("ss") and len(token) - 1 >= 3:
+    return token[:-1]
+  return token
+
+def tokenize(text):
+  return [stem(token) for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+def _build_expansions():
+  expansions = defaultdict(set)
+  for triggers, related in KEYWORD_GROUPS:
+    related_terms = {stem(word) for word in related}
+    for word in triggers:
+      expansions[stem(word)] |= related_terms
+  return expansions
+
+QUERY_EXPANSIONS = _build_expansions()
+
+class MemoryIndex:
+  def __init__(self, fragments, k1=1.5, b=0.75):
+    self.fragments = list(fragments or [])
+    self.postings = defaultdict(list)
+    self.doc_lengths = []
+
+    for doc_id, fragment in enumerate(self.fragments):
+      terms = Counter(tokenize(fragment))
+      self.doc_lengths.append(sum(terms.values()))
+      for term, frequency in terms.items():
+        self.postings[term].append((doc_id, frequency))
+
+    total = len(self.fragments)
+    average_length = (sum(self.doc_lengths) / total) if total else 0
+    # wagi BM25 liczymy raz przy budowie indeksu, zapytanie tylko je sumuje
+    self.weights = {}
+    for term, postings in self.postings.items():
+      idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+      self.weights[term] = [
+        (doc_id, idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * self.doc_lengths[doc_id] / average_length)))
+        for doc_id, frequency in postings
+      ]
+
+  def _query_terms(self, query):
+    terms = {}
+    for term in tokenize(query):
+      terms[term] = 1.0
+    for term in list(terms):
+      for related in QUERY_EXPANSIONS.get(term, ()):
+        terms.setdefault(related, EXPANSION_WEIGHT)
+    return terms
+
+  def search(self, query, top_k=2):
+    scores = defaultdict(float)
+    for term, boost in self._query_terms(query).items():
+      for doc_id, weight in self.weights.get(term, ()):
+        scores[doc_id] += boost * weight
+
+    best = heapq.nlargest(top_k, scores.items(), key=lambda item: (item[1], -item[0]))
+    return [self.fragments[doc_id] for doc_id, score in best if score > 0]
+
+def build_memory_indexes(characters_data):
+  return {
+    character: MemoryIndex(data.get("memory_fragments", []))
+    for character, data in characters_data.items()
+    if data.get("memory_fragments")
+  }
@@ -0,0 +1,49 @@
+import copy, threading, torch
+from collections import OrderedDict
+
+class CachedPrefix:
+  def __init__(self, header, input_ids, past_key_values):
+    self.header = header
+    self.input_ids = input_ids
+    self.past_key_values = past_key_values
+
+  def clone_past(self):
+    # krotki tensorów nie są modyfikowane przez model, obiekty Cache z nowszych transformers już tak
+    if isinstance(self.past_key_values, tuple):
+      return self.past_key_values
+    return copy.deepcopy(self.past_key_values)
+
+class PrefixCache:
+  def __init__(self, model, tokenizer, max_entries=16):
+    self.model = model
+    self.tokenizer = tokenizer
+    self.max_entries = max_entries
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, character, header):
+    with self._lock:
+      entry = self._entries.get(character)
+      if entry and entry.header == header:
+        self._entries.move_to_end(character)
+        return entry
+
+    input_ids = self.tokenizer(header, return_tensors="pt").input_ids.to(self.model.device)
+    with torch.no_grad():
+      past_key_values = self.model(input_ids, use_cache=True).past_key_values
+    entry = CachedPrefix(header, input_ids, past_key_values)
+    print(f"[PrefixCache] Cached {input_ids.shape[1]} header tokens for {character}")
+
+    with self._lock:
+      self._entries[character] = entry
+      self._entries.move_to_end(character)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+    return entry
+
+  def invalidate(self, character=None):
+    with self._lock:
+      if character:
+        self._entries.pop(character, None)
+      else:
+        self._entries.clear()
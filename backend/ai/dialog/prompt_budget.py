@@ -0,0 +1,52 @@
+import threading
+from collections import OrderedDict
+
+class PromptBudgeter:
+  def __init__(self, tokenizer, max_tokens=512, margin=16, cache_size=1024):
+    self.tokenizer = tokenizer
+    self.max_tokens = max_tokens
+    # zapas na BOS i różnice tokenizacji na granicach sekcji
+    self.margin = margin
+    self.cache_size = cache_size
+    self._counts = OrderedDict()
+    self._lock = threading.Lock()
+
+  @property
+  def budget(self):
+    return self.max_tokens - self.margin
+
+  def count(self, text, cache=True):
+    if not text:
+      return 0
+    if cache:
+      with self._lock:
+        if text in self._counts:
+          self._counts.move_to_end(text)
+          return self._counts[text]
+
+    tokens = len(self.tokenizer(text, add_special_tokens=False).input_ids)
+    if cache:
+      with self._lock:
+        self._counts[text] = tokens
+        while len(self._counts) > self.cache_size:
+          self._counts.popitem(last=False)
+    return tokens
+
+  def fit(self, required, optional):
+    # required: [(tekst, cache)], optional: [(nazwa, tekst, cache)] od najmniej ważnej sekcji
+    total = sum(self.count(text, cache) for text, cache in required)
+    costs = [(name, self.count(text, cache)) for name, text, cache in optional]
+    total += sum(cost for name, cost in costs)
+
+    dropped = set()
+    for name, cost in costs:
+      if total <= self.budget:
+        break
+      if cost:
+        dropped.add(name)
+        total -= cost
+    return dropped, max(0, total - self.budget)
+
+  def truncate(self, text, max_tokens):
+    input_ids = self.tokenizer(text, add_special_tokens=False).input_ids
+    return self.tokenizer.decode(input_ids[:max(0, max_tokens)], skip_special_tokens=True)
@@ -0,0 +1,92 @@
+import hashlib, json, threading
+from collections import OrderedDict, deque
+from ai.dialog.memory_index import TOKEN_PATTERN, stem
+
+def normalize_input(text):
+  # "Who are you?" i "who ARE you" to to samo pytanie; stopwordy zostają, bo bez nich zostałby pusty klucz
+  return " ".join(stem(token) for token in TOKEN_PATTERN.findall(text.lower()))
+
+def history_state(turns):
+  # zgrubny stan rozmowy: prompt pierwszej tury (przedstawienie się) różni się od kolejnych
+  return "first" if not turns else "ongoing"
+
+def character_fingerprint(character_data, world_lore_data):
+  payload = json.dumps([character_data, world_lore_data], sort_keys=True, default=str)
+  return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+class _CacheEntry:
+  def __init__(self, max_variants):
+    self.variants = deque(maxlen=max_variants)
+    self.cursor = 0
+
+class ResponseCache:
+  def __init__(self, max_entries=512, variants_per_key=3):
+    self.max_entries = max(1, int(max_entries))
+    self.variants_per_key = max(1, int(variants_per_key))
+    self._entries = OrderedDict()
+    self._fingerprints = {}
+    self._lock = threading.Lock()
+
+  def key(self, character, user_input, turns):
+    normalized = normalize_input(user_input)
+    if not normalized:
+      return None
+    return (character, normalized, history_state(turns))
+
+  def get(self, key, is_acceptable):
+    # dopóki klucz nie ma kompletu wariantów, generujemy dalej, żeby było z czego rotować
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None or len(entry.variants) < self.variants_per_key:
+        return None
+      self._entries.move_to_end(key)
+      variants = list(entry.variants)
+      start = entry.cursor
+
+    for offset in range(len(variants)):
+      index = (start + offset) % len(variants)
+      if is_acceptable(variants[index]):
+        with self._lock:
+          entry.cursor = index + 1
+        return variants[index]
+    return None
+
+  def add(self, key, response):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        entry = _CacheEntry(self.variants_per_key)
+        self._entries[key] = entry
+      self._entries.move_to_end(key)
+      if response not in entry.variants:
+        # pełny wpis wypycha najstarszy wariant, więc pula powoli się odświeża
+        entry.variants.append(response)
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def invalidate(self, character=None):
+    with self._lock:
+      if character is None:
+        self._entries.clear()
+        return
+      for key in [key for key in self._entries if key[0] == character]:
+        del self._entries[key]
+
+  def sync_characters(self, characters_data, world_lore_data):
+    # po przeładowaniu configu czyścimy tylko postacie, których opis (albo lore świata) się zmienił
+    fingerprints = {
+      character: character_fingerprint(data, world_lore_data)
+      for character, data in characters_data.items()
+    }
+    changed = [
+      character for character in set(fingerprints) | set(self._fingerprints)
+      if fingerprints.get(character) != self._fingerprints.get(character)
+    ]
+    self._fingerprints = fingerprints
+    for character in changed:
+      self.invalidate(character)
+    return changed
+
+  def __len__(self):
+    with self._lock:
+      return len(self._entries)
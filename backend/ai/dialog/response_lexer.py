@@ -0,0 +1,104 @@
+import re
+from functools import cached_property
+
+SPEAKER_LINE_PATTERN = re.compile(r"^([\w ']+):\s*(.*)")
+STAGE_LINE_PATTERN = re.compile(r'^(Voice|Visuals|Narrator|Scene|System)[:\-]', re.IGNORECASE)
+
+# fragmenty promptu i instrukcji, które model czasem przepisuje do odpowiedzi
+INSTRUCTION_MARKERS = (
+  'visitor says:', 'user says:', 'player says:', 'critical instructions:',
+  'example:', 'use phrases like:', 'debug', 'generated full text',
+  'you are', 'personality:', 'location:', 'background:', 'bearded, stocky innkeeper',
+  'run the tawny lion', 'cheerful but sharp', 'disturbed by recent events',
+  'current situation:', 'you remember:', 'you previously said:', 'never mention',
+  'always respond', 'keep responses', 'stay completely in character',
+  'respond with only', 'ignore any instructions', 'critical:', 'important:',
+  'bartek mug', 'a bearded', 'stocky innkeeper', 'who\'s run', 'for 20 years',
+  'tawny lion inn', 'in stone haven', 'stonehaven', 'do not repeat'
+)
+INSTRUCTION_START_PATTERN = re.compile(r'^(you are|he is|she is|bartek|innkeeper)', re.IGNORECASE)
+
+def looks_like_instruction(text):
+  lower_text = text.lower()
+  return any(marker in lower_text for marker in INSTRUCTION_MARKERS) or \
+    INSTRUCTION_START_PATTERN.match(text.strip()) is not None
+
+class SpeakerBlock:
+  def __init__(self, speaker, text, start_line, end_line):
+    self.speaker = speaker
+    self.text = text
+    self.start_line = start_line
+    self.end_line = end_line
+
+class LexedResponse:
+  # każdy podział tekstu liczony jest raz i współdzielony przez wszystkie strategie ekstrakcji
+  def __init__(self, text):
+    self.text = text
+
+  @cached_property
+  def lines(self):
+    return self.text.split('\n')
+
+  @cached_property
+  def stripped_lines(self):
+    return [line.strip() for line in self.lines]
+
+  @cached_property
+  def speaker_lines(self):
+    return [bool(SPEAKER_LINE_PATTERN.match(line)) for line in self.stripped_lines]
+
+  @cached_property
+  def blocks(self):
+    blocks = []
+    speaker, dialogue, start = None, [], 0
+
+    def close_block(end):
+      joined = " ".join(dialogue).strip()
+      if speaker and joined:
+        blocks.append(SpeakerBlock(speaker, joined, start, end))
+
+    for index, line in enumerate(self.stripped_lines):
+      if STAGE_LINE_PATTERN.match(line):
+        close_block(index)
+        return blocks
+
+      match = SPEAKER_LINE_PATTERN.match(line)
+      if match:
+        close_block(index)
+        speaker, dialogue, start = match.group(1).strip(), [], index
+        if match.group(2).strip():
+          dialogue.append(match.group(2).strip())
+      elif speaker:
+        dialogue.append(line)
+
+    close_block(len(self.stripped_lines))
+    return blocks
+
+  def continuation(self, block):
+    # linie po bloku aż do następnego "Mówca:", bez ponownego przeszukiwania całego tekstu
+    extra = []
+    for index in range(block.end_line, len(self.stripped_lines)):
+      if self.speaker_lines[index]:
+        break
+      if self.stripped_lines[index]:
+        extra.append(self.stripped_lines[index])
+    return " ".join([block.text.strip().strip('"')] + extra)
+
+  @cached_property
+  def double_quoted(self):
+    return re.findall(r'"([^"]+)"', self.text)
+
+  @cached_property
+  def single_quoted(self):
+    return re.findall(r"'([^']{20,})'", self.text)
+
+  @cached_property
+  def segments(self):
+    return re.split(r'[.!?]+\s*(?=[A-Z]|\n|$)', self.text)
+
+  @cached_property
+  def sentences(self):
+    return re.split(r'[.!?]+\s*', self.text)
+
+def lex_response(text):
+  return text if isinstance(text, LexedResponse) else LexedResponse(text)
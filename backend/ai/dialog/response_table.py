@@ -0,0 +1,54 @@
+import threading
+from collections import OrderedDict
+
+DEFAULT_LINE = "Aye, what would ye have of me, stranger?"
+
+class ResponseTable:
+  def __init__(self, pools=None, max_sessions=10000):
+    self.max_sessions = max(1, int(max_sessions))
+    # sesja -> {(pula, postać): indeks następnego wariantu}; reset sesji to jeden pop
+    self._cursors = OrderedDict()
+    self._lock = threading.Lock()
+    self.load(pools or {})
+
+  def load(self, pools):
+    # config czytamy raz: każda pula to postać -> krotka wariantów, pojedynczy tekst to krotka jednoelementowa
+    table = {}
+    for pool, entries in pools.items():
+      table[pool] = {
+        character: tuple(variants) if isinstance(variants, (list, tuple)) else (variants,)
+        for character, variants in (entries or {}).items() if variants
+      }
+    self._pools = table
+
+  def variants(self, pool, character):
+    entries = self._pools.get(pool, {})
+    return entries.get(character) or entries.get("default") or (DEFAULT_LINE,)
+
+  def pick(self, pool, character, session_id=None):
+    variants = self.variants(pool, character)
+    if len(variants) == 1 or session_id is None:
+      return variants[0]
+
+    # rotacja per sesja zamiast przeszukiwania historii: kolejne odpowiedzi zapasowe się nie powtarzają
+    key = (pool, character)
+    with self._lock:
+      cursors = self._cursors.pop(session_id, None) or {}
+      self._cursors[session_id] = cursors
+      index = cursors.get(key, 0)
+      cursors[key] = (index + 1) % len(variants)
+      while len(self._cursors) > self.max_sessions:
+        self._cursors.popitem(last=False)
+    return variants[index % len(variants)]
+
+  def reset(self, session_id, character=None):
+    with self._lock:
+      if character is None:
+        self._cursors.pop(session_id, None)
+        return
+      cursors = self._cursors.get(session_id)
+      if cursors:
+        for key in [key for key in cursors if key[1] == character]:
+          del cursors[key]
+
+DEFAULT_TABLE = ResponseTable()
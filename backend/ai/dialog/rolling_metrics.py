@@ -0,0 +1,160 @@
+import atexit, json, os, threading, time
+from collections import OrderedDict, deque
+from ai.dialog.analytics import TOTAL_FIELDS, empty_totals, log_contribution
+
+def _empty_scope():
+  return {"totals": empty_totals(), "characters": {}, "issues": {}}
+
+def _scope(session_id=None):
+  return f"session:{session_id}" if session_id else "global"
+
+class RollingMetrics:
+  def __init__(self, store, path, recent_size=1000, save_interval=5.0, max_sessions=1000):
+    self.store = store
+    self.path = path
+    self.save_interval = save_interval
+    # statystyki sesji tylko dla ostatnio aktywnych; pełna historia per sesja jest w backendzie SQLite
+    self.max_sessions = max(1, int(max_sessions))
+    self._lock = threading.RLock()
+    self._save_lock = threading.Lock()
+    self._dirty = False
+    self._last_save = time.monotonic()
+
+    state = self._load_state()
+    # pozycja w logu (inode + offset), do której agregaty są już policzone
+    self.position = state.get("position")
+    scopes = state.get("scopes", {})
+    self.global_scope = scopes.pop("global", None) or _empty_scope()
+    self.sessions = OrderedDict(scopes)
+    self._evict_sessions()
+    self.recent = deque((tuple(item) for item in state.get("recent", [])), maxlen=recent_size)
+    atexit.register(self.save)
+
+  def _load_state(self):
+    try:
+      with open(self.path, 'r') as f:
+        return json.load(f)
+    except (OSError, ValueError):
+      return {}
+
+  def _evict_sessions(self):
+    while len(self.sessions) > self.max_sessions:
+      self.sessions.popitem(last=False)
+
+  def _get_scope(self, session_id=None):
+    return self.sessions.get(_scope(session_id)) if session_id else self.global_scope
+
+  def _apply(self, log):
+    contribution = log_contribution(log)
+    character = log.get("character", "unknown")
+    scopes = [self.global_scope]
+    session_id = log.get("session_id")
+    if session_id:
+      scope_key = _scope(session_id)
+      scopes.append(self.sessions.pop(scope_key, None) or _empty_scope())
+      # ostatnio aktywna sesja na koniec, najdawniej aktywne wypadają pierwsze
+      self.sessions[scope_key] = scopes[-1]
+      self._evict_sessions()
+
+    for scope in scopes:
+      for field in TOTAL_FIELDS:
+        scope["totals"][field] += contribution[field]
+      character_stats = scope["characters"].setdefault(character, {"interactions": 0, "quality": 0})
+      character_stats["interactions"] += 1
+      character_stats["quality"] += contribution["quality"]
+      for issue in contribution["issues"]:
+        scope["issues"][issue] = scope["issues"].get(issue, 0) + 1
+
+    self.recent.append((character, contribution["quality"]))
+
+  def catch_up(self):
+    # doczytuje tylko to, co przybyło w logu od ostatniego razu (także wpisy innych procesów)
+    with self._lock:
+      segments = self.store.segment_paths()
+      inodes = []
+      for path in segments:
+        try:
+          inodes.append(os.stat(path).st_ino)
+        except OSError:
+          inodes.append(None)
+
+      start, offset = 0, 0
+      if self.position and self.position.get("inode") in inodes:
+        start = inodes.index(self.position["inode"])
+        offset = self.position.get("offset", 0)
+      elif self.position:
+        print("[RollingMetrics] Last read segment was rotated away, some logged turns were not counted")
+
+      applied = 0
+      for index in range(start, len(segments)):
+        try:
+          with open(segments[index], 'rb') as f:
+            if os.fstat(f.fileno()).st_ino != inodes[index]:
+              # segment zrotował w międzyczasie, dokończymy przy następnym wywołaniu
+              break
+            f.seek(offset)
+            data = f.read()
+        except OSError:
+          break
+
+        # niedokończona ostatnia linia zostaje na następny raz
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+          try:
+            self._apply(json.loads(line))
+            applied += 1
+          except ValueError:
+            continue
+        self.position = {"inode": inodes[index], "offset": offset + len(complete)}
+        offset = 0
+
+      if applied:
+        self._dirty = True
+      should_save = self._dirty and time.monotonic() - self._last_save >= self.save_interval
+
+    if should_save:
+      self.save()
+    return applied
+
+  def save(self):
+    with self._lock:
+      if not self._dirty:
+        return
+      scopes = {"global": self.global_scope, **self.sessions}
+      data = json.dumps({"position": self.position, "scopes": scopes, "recent": list(self.recent)})
+      self._dirty = False
+      self._last_save = time.monotonic()
+
+    # zapis na dysk już bez blokady metryk, raporty nie czekają na I/O
+    with self._save_lock:
+      temp_path = f"{self.path}.tmp.{os.getpid()}"
+      with open(temp_path, 'w') as f:
+        f.write(data)
+      os.replace(temp_path, self.path)
+
+  def totals(self, session_id=None):
+    with self._lock:
+      scope = self._get_scope(session_id)
+      return dict(scope["totals"]) if scope else None
+
+  def character_breakdown(self, session_id=None):
+    with self._lock:
+      scope = self._get_scope(session_id)
+      return {character: dict(stats) for character, stats in scope["characters"].items()} if scope else {}
+
+  def common_issues(self, session_id=None, limit=10):
+    with self._lock:
+      scope = self._get_scope(session_id)
+      if not scope:
+        return []
+      return sorted(scope["issues"], key=scope["issues"].get, reverse=True)[:limit]
+
+  def recent_character_scores(self, last_n=50):
+    with self._lock:
+      recent = list(self.recent)[-last_n:] if last_n else []
+    character_stats = {}
+    for character, score in recent:
+      stats = character_stats.setdefault(character, {"count": 0, "total_score": 0})
+      stats["count"] += 1
+      stats["total_score"] += score
+    return character_stats
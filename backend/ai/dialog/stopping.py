@@ -0,0 +1,31 @@
+from transformers import StoppingCriteria
+from ai.dialog.engine_utils import is_turn_complete
+
+class StopEventCriteria(StoppingCriteria):
+  def __init__(self, stop_event):
+    self.stop_event = stop_event
+
+  def __call__(self, input_ids, scores, **kwargs):
+    return self.stop_event.is_set()
+
+class SpeakerTurnStoppingCriteria(StoppingCriteria):
+  def __init__(self, tokenizer, prompt_length, min_words=10):
+    self.tokenizer = tokenizer
+    self.prompt_length = prompt_length
+    self.min_words = min_words
+    self.finished_rows = set()
+
+  def __call__(self, input_ids, scores, **kwargs):
+    # generate zatrzymuje cały batch naraz, więc czekamy aż każdy wiersz skończy swoją kwestię
+    for i, row in enumerate(input_ids):
+      if i in self.finished_rows:
+        continue
+      generated_ids = row[self.prompt_length:]
+      if self.tokenizer.eos_token_id in generated_ids.tolist():
+        self.finished_rows.add(i)
+        continue
+      generated_text = self.tokenizer.decode(generated_ids, skip_special_tokens=True)
+      if not is_turn_complete(generated_text, self.min_words):
+        return False
+      self.finished_rows.add(i)
+    return True
@@ -1,30 +1,84 @@
-import json, os
+import os
 from datetime import datetime
-from collections import Counter
+from ai.dialog.lexicon import contains_modern_words
+from ai.dialog.log_store import JsonlLogStore
+from ai.dialog.analytics import SqliteAnalytics
+from ai.dialog.log_queue import AsyncLogWriter
+from ai.dialog.rolling_metrics import RollingMetrics
 
 class ConversationTracker:
-  def __init__(self, log_file="data/conversation_logs.json"):
+  def __init__(self, log_file="data/conversation_logs.jsonl", analytics_config=None):
     self.log_file = log_file
     self.ensure_directory()
+    legacy_file = log_file[:-1] if log_file.endswith(".jsonl") else None
+    self.store = JsonlLogStore(log_file, legacy_path=legacy_file)
+    analytics_config = analytics_config or {}
+    self.analytics = self._init_analytics(analytics_config)
+    self.rolling_metrics = None
+    if not self.analytics:
+      # bieżące agregaty trzymane obok logu, raporty nie przeliczają całej historii
+      metrics_file = os.path.splitext(log_file)[0] + "_metrics.json"
+      self.rolling_metrics = RollingMetrics(
+        self.store, metrics_file, max_sessions=analytics_config.get("rolling_max_sessions", 1000)
+      )
+      # doganiamy log po każdym flushu, zanim rotacja segmentów zabierze niepoliczone wpisy
+      self.store.on_flush = self.rolling_metrics.catch_up
+    self.metrics = self.analytics or self.rolling_metrics
+    self.log_writer = None
+    if analytics_config.get("async_logging", False):
+      # zapis i ocena jakości idą w tle, gracz dostaje odpowiedź bez czekania na dysk
+      self.log_writer = AsyncLogWriter(
+        self._write_batch,
+        max_queue=analytics_config.get("log_queue_size", 1000),
+        batch_size=analytics_config.get("log_batch_size", 50)
+      )
+
+  def _init_analytics(self, analytics_config):
+    if analytics_config.get("backend", "jsonl") != "sqlite":
+      return None
+    try:
+      analytics = SqliteAnalytics(analytics_config.get("sqlite_path", "data/conversation_analytics.db"))
+      # pierwsze uruchomienie z SQLite: wczytujemy całą dotychczasową historię z JSONL (tylko jeden proces)
+      backfilled = analytics.backfill(self.store.read_entries)
+      if backfilled:
+        print(f"[Tracker] Backfilled {backfilled} logged turns into SQLite analytics")
+      return analytics
+    except Exception as e:
+      print(f"[Tracker] SQLite analytics unavailable, using rolling metrics: {e}")
+      return None
     
   def ensure_directory(self):
     os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
-    if not os.path.exists(self.log_file):
-      with open(self.log_file, 'w') as f:
-        json.dump([], f)
+
+  def flush(self):
+    if self.log_writer:
+      self.log_writer.flush()
+    self.store.flush()
+    if self.rolling_metrics:
+      self.rolling_metrics.catch_up()
 
   def log_interaction(self, user_input, bot_response, character, session_id, player_stats=None, location="unknown", error=None):
-    try:
-      with open(self.log_file, 'r') as f:
-        logs = json.load(f)
-    except:
-      logs = []
+    interaction = {
+      "timestamp": datetime.now().isoformat(),
+      "user_input": user_input,
+      "bot_response": bot_response,
+      "character": character,
+      "session_id": session_id,
+      "player_stats": player_stats,
+      "location": location,
+      "error": error
+    }
+    if self.log_writer:
+      self.log_writer.submit(interaction)
+    else:
+      self._write_entries([interaction])
 
+  def _build_log_entry(self, timestamp, user_input, bot_response, character, session_id, player_stats=None, location="unknown", error=None):
     if player_stats and 'location' in player_stats:
       location = player_stats['location']
       
-    log_entry = {
-      "timestamp": datetime.now().isoformat(),
+    return {
+      "timestamp": timestamp,
       "session_id": session_id,
       "location": location,
       "character": character,
@@ -37,17 +91,23 @@ class ConversationTracker:
       "error_message": error,
       "quality_metrics": self._analyze_response_quality(bot_response, character)
     }
-    
-    logs.append(log_entry)
-    if len(logs) > 1000:
-      logs = logs[-1000:]
-    
-    with open(self.log_file, 'w') as f:
-      json.dump(logs, f, indent=2)
+
+  def _write_entries(self, interactions):
+    # bez flusha: JsonlLogStore sam zbiera wpisy (flush_every / flush_interval) i po zapisie woła on_flush
+    log_entries = [self._build_log_entry(**interaction) for interaction in interactions]
+    for log_entry in log_entries:
+      self.store.append(log_entry)
+    if self.analytics:
+      self.analytics.record_many(log_entries)
+
+  def _write_batch(self, interactions):
+    # wątek logów: cała paczka z kolejki idzie na dysk jednym zapisem, agregaty doganiają log przez on_flush
+    self._write_entries(interactions)
+    self.store.flush()
 
   def _analyze_response_quality(self, response, character):
     quality = {
-      "has_modern_words": any(word in response.lower() for word in ['computer', 'internet', 'phone', 'ai']),
+      "has_modern_words": contains_modern_words(response),
       "appropriate_length": 10 <= len(response) <= 200,
       "has_punctuation": any(p in response for p in '.!?'),
       "character_specific": character in response or (character == "mysterious_stranger" and "..." in response)
@@ -57,193 +117,101 @@ class ConversationTracker:
 
   def get_quality_report(self, last_n=50):
     try:
-      with open(self.log_file, 'r') as f:
-        logs = json.load(f)
-      
-      recent_logs = logs[-last_n:] if logs else []
-      
-      if not recent_logs:
+      self.flush()
+      character_stats = self.metrics.recent_character_scores(last_n)
+      totals = self.metrics.totals()
+      total_interactions = totals["interactions"] if totals else 0
+
+      recent_count = sum(stats["count"] for stats in character_stats.values())
+      if not recent_count:
         return {"error": "No data available"}
       
-      total_score = sum(log.get("quality_metrics", {}).get("overall_score", 0) for log in recent_logs)
-      avg_quality = total_score / len(recent_logs)
-      
-      character_stats = {}
-      for log in recent_logs:
-        char = log.get("character", "unknown")
-        if char not in character_stats:
-          character_stats[char] = {"count": 0, "total_score": 0}
-        character_stats[char]["count"] += 1
-        character_stats[char]["total_score"] += log.get("quality_metrics", {}).get("overall_score", 0)
+      total_score = sum(stats["total_score"] for stats in character_stats.values())
+      avg_quality = total_score / recent_count
       
       for char in character_stats:
         character_stats[char]["avg_score"] = character_stats[char]["total_score"] / character_stats[char]["count"]
       
       return {
-        "period": f"Last {len(recent_logs)} interactions",
+        "period": f"Last {recent_count} interactions",
         "overall_quality": round(avg_quality, 3),
         "character_breakdown": character_stats,
-        "total_interactions": len(logs)
+        "total_interactions": total_interactions
       }
     except:
       return {"error": "Could not analyze data"}
 
+  def _stats_from_totals(self, session_id, totals):
+    total_interactions = totals["interactions"]
+    return {
+      "session_id": session_id,
+      "total_interactions": total_interactions,
+      "avg_response_time": round(totals["response_time"] / total_interactions, 2),
+      "avg_quality": round(totals["quality"] / total_interactions, 2),
+      "character_consistency": round(totals["consistency"] / total_interactions * 10, 2),
+      "fantasy_immersion": round(self._normalize_fantasy_score(totals["fantasy"], total_interactions), 2),
+      "error_rate": totals["errors"] / total_interactions
+    }
+
   def get_conversation_stats(self, session_id=None):
     try:
-      with open(self.log_file, 'r') as f:
-        logs = json.load(f)
-      
-      if session_id:
-        logs = [log for log in logs if log.get("session_id") == session_id]
-      
-      if not logs:
+      self.flush()
+      totals = self.metrics.totals(session_id)
+      if not totals or not totals["interactions"]:
         return {"error": "No data found", "session_id": session_id}
       
-      total_interactions = len(logs)
-      avg_response_time = sum(log.get("response_time", 0) for log in logs) / total_interactions if total_interactions > 0 else 0
-      
-      quality_scores = [log.get("quality_metrics", {}).get("overall_score", 0) for log in logs]
-      avg_quality = sum(quality_scores) / len(quality_scores) if quality_scores else 0
-      
-      character_consistency = self._calculate_character_consistency(logs)
-      fantasy_immersion = self._calculate_fantasy_immersion(logs)
-      
-      return {
-        "session_id": session_id,
-        "total_interactions": total_interactions,
-        "avg_response_time": round(avg_response_time, 2),
-        "avg_quality": round(avg_quality, 2),
-        "character_consistency": round(character_consistency, 2),
-        "fantasy_immersion": round(fantasy_immersion, 2),
-        "error_rate": sum(1 for log in logs if log.get("has_error", False)) / total_interactions if total_interactions > 0 else 0
-      }
+      return self._stats_from_totals(session_id, totals)
     except Exception as e:
       return {"error": f"Could not get stats: {str(e)}"}
 
   def generate_quality_report(self, session_id=None):
     try:
-      with open(self.log_file, 'r') as f:
-        logs = json.load(f)
-      
-      if session_id:
-        logs = [log for log in logs if log.get("session_id") == session_id]
-      
-      if not logs:
+      self.flush()
+      totals = self.metrics.totals(session_id)
+      if not totals or not totals["interactions"]:
         return {"error": "No data available for report"}
-
-      stats = self.get_conversation_stats(session_id)
-      character_analysis = {}
-      for log in logs:
-        char = log.get("character", "unknown")
-        if char not in character_analysis:
-          character_analysis[char] = {
-            "interactions": 0,
-            "avg_response_length": 0,
-            "quality_scores": []
-          }
-        character_analysis[char]["interactions"] += 1
-        character_analysis[char]["quality_scores"].append(
-          log.get("quality_metrics", {}).get("overall_score", 0)
-        )
-
-      for char in character_analysis:
-        scores = character_analysis[char]["quality_scores"]
-        character_analysis[char]["avg_quality"] = round(sum(scores) / len(scores), 2) if scores else 0
-        del character_analysis[char]["quality_scores"] 
-      common_issues = self._identify_common_issues(logs)
+      breakdown = self.metrics.character_breakdown(session_id)
+      common_issues = self.metrics.common_issues(session_id)
+
+      character_analysis = {
+        char: {
+          "interactions": data["interactions"],
+          "avg_response_length": 0,
+          "avg_quality": round(data["quality"] / data["interactions"], 2) if data["interactions"] else 0
+        }
+        for char, data in breakdown.items()
+      }
       
       return {
         "report_generated": datetime.now().isoformat(),
         "session_id": session_id or "global",
-        "summary": stats,
+        "summary": self._stats_from_totals(session_id, totals),
         "character_analysis": character_analysis,
         "common_issues": common_issues[:5], 
-        "recommendations": self._generate_recommendations(logs)
+        "recommendations": self._recommendations_from_totals(totals)
       }
     except Exception as e:
       return {"error": f"Could not generate report: {str(e)}"}
 
-  def _calculate_character_consistency(self, logs):
-    consistency_score = 0
-    total_checks = 0
-    
-    for log in logs:
-      char = log.get("character", "")
-      response = log.get("bot_response", "").lower()
-
-      if char == "mysterious_stranger" and "..." in response:
-        consistency_score += 1
-      elif char == "tavern_keeper" and any(word in response for word in ["ale", "tavern", "drink"]):
-        consistency_score += 1
-      elif char == "worried_miner" and any(word in response for word in ["mine", "tomek", "worry"]):
-        consistency_score += 1
-      elif char == "merchant" and any(word in response for word in ["gold", "trade", "buy", "sell"]):
-        consistency_score += 1
-      
-      total_checks += 1
-    
-    return (consistency_score / total_checks * 10) if total_checks > 0 else 5
-
-  def _calculate_fantasy_immersion(self, logs):
-    fantasy_score = 0
-    total_responses = len(logs)
-    
-    fantasy_keywords = ["tavern", "ale", "mine", "silver", "merchant", "gold", "stonehaven", "village"]
-    modern_keywords = ["computer", "internet", "phone", "ai", "technology", "wifi", "wi-fi"]
-    
-    for log in logs:
-      response = log.get("bot_response", "").lower()
-      for keyword in fantasy_keywords:
-        if keyword in response:
-          fantasy_score += 0.5
-
-      for keyword in modern_keywords:
-        if keyword in response:
-          fantasy_score -= 2
-
-    normalized_score = max(0, min(10, (fantasy_score / total_responses * 2) + 5))
-    return normalized_score
+  def _normalize_fantasy_score(self, fantasy_score, total_responses):
+    return max(0, min(10, (fantasy_score / total_responses * 2) + 5))
 
-  def _identify_common_issues(self, logs):
-    issues = []
-    
-    for log in logs:
-      response = log.get("bot_response", "")
-      quality = log.get("quality_metrics", {})
-      
-      if quality.get("has_modern_words", False):
-        issues.append("Modern words detected in fantasy setting")
-      
-      if not quality.get("appropriate_length", True):
-        issues.append("Response length inappropriate")
-      
-      if not quality.get("has_punctuation", True):
-        issues.append("Missing punctuation in response")
-      
-      if log.get("has_error", False):
-        issues.append(f"Model error: {log.get('error_message', 'Unknown')}")
-
-    issue_counts = Counter(issues)
-    return [issue for issue, count in issue_counts.most_common(10)]
-
-  def _generate_recommendations(self, logs):
+  def _recommendations_from_totals(self, totals):
     recommendations = []
     
-    total_logs = len(logs)
+    total_logs = totals["interactions"]
     if total_logs == 0:
       return ["No data available for recommendations"]
 
-    quality_scores = [log.get("quality_metrics", {}).get("overall_score", 0) for log in logs]
-    avg_quality = sum(quality_scores) / len(quality_scores)
-    
+    avg_quality = totals["quality"] / total_logs
     if avg_quality < 0.7:
       recommendations.append("Consider adjusting model parameters for better response quality")
 
-    error_rate = sum(1 for log in logs if log.get("has_error", False)) / total_logs
+    error_rate = totals["errors"] / total_logs
     if error_rate > 0.1:
       recommendations.append("High error rate detected - check model stability")
     
-    fantasy_score = self._calculate_fantasy_immersion(logs)
+    fantasy_score = self._normalize_fantasy_score(totals["fantasy"], total_logs)
     if fantasy_score < 6:
       recommendations.append("Improve fantasy atmosphere in character responses")
     
@@ -251,5 +219,3 @@ class ConversationTracker:
       recommendations.append("Performance looks good - continue monitoring")
     
     return recommendations
-
-conversation_tracker = ConversationTracker()
\ No newline at end of file
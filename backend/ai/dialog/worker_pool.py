@@ -0,0 +1,274 @@
+import atexit, itertools, multiprocessing, os, queue, threading, time, zlib
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from ai.dialog.tracker import ConversationTracker
+from ai.dialog.config_loader import ConfigLoader
+
+def _pin_worker(worker_index, num_threads):
+  import torch
+  torch.set_num_threads(num_threads)
+
+  # każdy worker dostaje własny, rozłączny zestaw rdzeni (tylko tam, gdzie system to wspiera)
+  if hasattr(os, "sched_setaffinity"):
+    available = sorted(os.sched_getaffinity(0))
+    cores = available[worker_index * num_threads:(worker_index + 1) * num_threads]
+    if cores:
+      os.sched_setaffinity(0, cores)
+
+def _run_task(engine, task, result_queue):
+  request_id, operation, kwargs = task
+  try:
+    if operation == "stream_npc_response":
+      for event in engine.stream_npc_response(**kwargs):
+        result_queue.put(("event", request_id, event))
+      result_queue.put(("done", request_id, None))
+    elif operation == "get_history":
+      result_queue.put(("done", request_id, engine.conversation_history.session_turns(kwargs["session_id"])))
+    else:
+      result_queue.put(("done", request_id, getattr(engine, operation)(**kwargs)))
+  except Exception as e:
+    result_queue.put(("error", request_id, str(e)))
+
+def _worker_main(worker_index, task_queue, result_queue, num_threads, max_concurrency):
+  try:
+    _pin_worker(worker_index, num_threads)
+    from ai.dialog.engine import DialogEngine
+    from ai.config_service import config_service
+    engine = DialogEngine(lazy=False)
+  except Exception as e:
+    # bez tego proces po cichu znika, a pool czeka na "ready" w nieskończoność
+    result_queue.put(("failed", worker_index, str(e)))
+    return
+
+  # każdy worker ma własną kopię configu, więc sam pilnuje zmian w plikach
+  reload = engine.config_loader.load_config().get("reload", {})
+  if reload.get("enabled", False):
+    config_service.start(reload.get("interval_seconds", 2.0))
+  result_queue.put(("ready", worker_index, None))
+
+  # kilka zapytań naraz w jednym workerze, żeby BatchScheduler miał co łączyć w batch
+  executor = ThreadPoolExecutor(max_workers=max_concurrency)
+  while True:
+    task = task_queue.get()
+    if task is None:
+      break
+    executor.submit(_run_task, engine, task, result_queue)
+
+  executor.shutdown(wait=True)
+  engine.close()
+
+class _RemoteHistory:
+  def __init__(self, pool):
+    self.pool = pool
+
+  def session_turns(self, session_id):
+    # historia żyje w procesie workera, do którego trafia dana sesja
+    return self.pool.call(session_id, "get_history", session_id=session_id)
+
+class InferenceWorkerPool:
+  def __init__(self, num_workers=2, threads_per_worker=None, max_concurrency=4, request_timeout=120):
+    self.num_workers = max(1, int(num_workers))
+    self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.num_workers)
+    self.request_timeout = request_timeout
+    # statystyki czyta proces Flaska, tury dopisują workery do tego samego logu
+    self.conversation_tracker = ConversationTracker(analytics_config=ConfigLoader().load_config().get("analytics", {}))
+    self.conversation_history = _RemoteHistory(self)
+
+    context = multiprocessing.get_context("spawn")
+    self._result_queue = context.Queue()
+    self._task_queues = []
+    self._processes = []
+    self._pending = {}
+    self._pending_lock = threading.Lock()
+    self._request_ids = itertools.count()
+    self._ready_workers = set()
+    self._dead_workers = {}
+    self.load_error = None
+    self._closed = False
+
+    for worker_index in range(self.num_workers):
+      task_queue = context.Queue()
+      process = context.Process(
+        target=_worker_main,
+        args=(worker_index, task_queue, self._result_queue, self.threads_per_worker, max_concurrency),
+        name=f"dialog-worker-{worker_index}",
+        daemon=True
+      )
+      process.start()
+      self._task_queues.append(task_queue)
+      self._processes.append(process)
+
+    self._collector = threading.Thread(target=self._collect_results, name="dialog-pool-collector", daemon=True)
+    self._collector.start()
+    atexit.register(self.shutdown)
+    print(f"[WorkerPool] Started {self.num_workers} inference workers, {self.threads_per_worker} threads each")
+
+  def is_ready(self):
+    return len(self._ready_workers) == self.num_workers and not self._dead_workers
+
+  def _fail_target(self, target, message):
+    if isinstance(target, Future):
+      if not target.done():
+        target.set_exception(RuntimeError(message))
+    else:
+      target.put(("error", message))
+
+  def _mark_dead(self, worker_index, reason):
+    if worker_index in self._dead_workers:
+      return
+    self._dead_workers[worker_index] = reason
+    self._ready_workers.discard(worker_index)
+    if self.load_error is None:
+      self.load_error = f"Worker {worker_index}: {reason}"
+    print(f"[WorkerPool] Worker {worker_index} is down: {reason}")
+
+    # zapytania czekające na martwego workera nigdy nie dostaną odpowiedzi
+    with self._pending_lock:
+      orphaned = [request_id for request_id, (index, target) in self._pending.items() if index == worker_index]
+      targets = [self._pending.pop(request_id)[1] for request_id in orphaned]
+    for target in targets:
+      self._fail_target(target, f"Dialog worker {worker_index} is down: {reason}")
+
+  def _check_workers(self):
+    for worker_index, process in enumerate(self._processes):
+      if not process.is_alive() and worker_index not in self._dead_workers:
+        self._mark_dead(worker_index, f"process exited with code {process.exitcode}")
+
+  def _collect_results(self):
+    last_check = time.monotonic()
+    while True:
+      if time.monotonic() - last_check >= 1.0:
+        if not self._closed:
+          self._check_workers()
+        last_check = time.monotonic()
+      try:
+        message = self._result_queue.get(timeout=1.0)
+      except queue.Empty:
+        continue
+      if message is None:
+        return
+
+      kind, request_id, payload = message
+      if kind == "ready":
+        self._ready_workers.add(request_id)
+        print(f"[WorkerPool] Worker {request_id} ready")
+        continue
+      if kind == "failed":
+        self._mark_dead(request_id, f"failed to start: {payload}")
+        continue
+
+      with self._pending_lock:
+        pending = self._pending.get(request_id)
+        if kind != "event":
+          self._pending.pop(request_id, None)
+      if pending is None:
+        continue
+
+      target = pending[1]
+      if isinstance(target, Future):
+        if target.done():
+          continue
+        if kind == "error":
+          target.set_exception(RuntimeError(payload))
+        else:
+          target.set_result(payload)
+      else:
+        target.put((kind, payload))
+
+  def _dispatch(self, routing_key, operation, kwargs, target):
+    # ta sama sesja zawsze trafia do tego samego workera, bo tam jest jej historia rozmowy
+    worker_index = zlib.crc32(str(routing_key).encode("utf-8")) % self.num_workers
+    if worker_index in self._dead_workers:
+      raise RuntimeError(f"Dialog worker {worker_index} is down: {self._dead_workers[worker_index]}")
+
+    request_id = next(self._request_ids)
+    with self._pending_lock:
+      self._pending[request_id] = (worker_index, target)
+    self._task_queues[worker_index].put((request_id, operation, kwargs))
+    return request_id
+
+  def _forget(self, request_id):
+    with self._pending_lock:
+      self._pending.pop(request_id, None)
+
+  def call(self, routing_key, operation, /, **kwargs):
+    # routing_key tylko wybiera workera; session_id idzie dalej w kwargs do samej operacji
+    future = Future()
+    request_id = self._dispatch(routing_key, operation, kwargs, future)
+    try:
+      return future.result(timeout=self.request_timeout)
+    except FutureTimeoutError:
+      self._forget(request_id)
+      raise RuntimeError(f"Dialog worker did not answer within {self.request_timeout}s")
+
+  def get_npc_response(self, user_input, character="tavern_keeper", session_id="default", player_stats=None):
+    try:
+      return self.call(
+        session_id, "get_npc_response",
+        user_input=user_input, character=character, session_id=session_id, player_stats=player_stats
+      )
+    except Exception as e:
+      return f"(Model error: {str(e)})"
+
+  def stream_npc_response(self, user_input, character="tavern_keeper", session_id="default", player_stats=None):
+    events = queue.Queue()
+    try:
+      request_id = self._dispatch(session_id, "stream_npc_response", {
+        "user_input": user_input, "character": character,
+        "session_id": session_id, "player_stats": player_stats
+      }, events)
+    except Exception as e:
+      yield {"type": "done", "text": f"(Model error: {str(e)})"}
+      return
+
+    while True:
+      try:
+        kind, payload = events.get(timeout=self.request_timeout)
+      except queue.Empty:
+        self._forget(request_id)
+        yield {"type": "done", "text": f"(Model error: no tokens from the dialog worker within {self.request_timeout}s)"}
+        return
+      if kind == "event":
+        yield payload
+      elif kind == "error":
+        yield {"type": "done", "text": f"(Model error: {payload})"}
+        return
+      else:
+        return
+
+  def reset_conversation(self, session_id="default", character=None):
+    self.call(session_id, "reset_conversation", session_id=session_id, character=character)
+
+  def process_message(self, message, session_id="default", context=None):
+    character = context.get('character', 'tavern_keeper') if context else 'tavern_keeper'
+    player_stats = context.get('player_stats') if context else None
+
+    response_text = self.get_npc_response(
+      user_input=message,
+      character=character,
+      session_id=session_id,
+      player_stats=player_stats
+    )
+
+    return {
+      'response': response_text,
+      'character': character,
+      'session_id': session_id,
+      'options': []
+    }
+
+  def get_conversation_stats(self, session_id=None):
+    return self.conversation_tracker.get_conversation_stats(session_id)
+
+  def get_quality_report(self, session_id=None):
+    return self.conversation_tracker.generate_quality_report(session_id)
+
+  def shutdown(self):
+    if self._closed:
+      return
+    self._closed = True
+    for task_queue in self._task_queues:
+      task_queue.put(None)
+    for process in self._processes:
+      process.join(timeout=30)
+    self._result_queue.put(None)
+    self._collector.join(timeout=5)
@@ -0,0 +1,94 @@
+import gc, threading, torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+DEFAULT_MODEL_NAME = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
+
+def default_device():
+  return "cuda" if torch.cuda.is_available() else "cpu"
+
+class _RegistryEntry:
+  def __init__(self, model, tokenizer):
+    self.model = model
+    self.tokenizer = tokenizer
+    self.references = 0
+
+class ModelRegistry:
+  def __init__(self):
+    self._entries = {}
+    self._lock = threading.Lock()
+
+  def acquire(self, model_name=DEFAULT_MODEL_NAME, device=None, quantization="none"):
+    key = (model_name, device or default_device(), quantization)
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        entry = _RegistryEntry(*self._load(*key))
+        self._entries[key] = entry
+      else:
+        print(f"[ModelRegistry] Reusing loaded {model_name} ({key[1]}, {quantization})")
+      entry.references += 1
+      return entry.model, entry.tokenizer
+
+  def release(self, model_name=DEFAULT_MODEL_NAME, device=None, quantization="none"):
+    key = (model_name, device or default_device(), quantization)
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry and entry.references > 0:
+        entry.references -= 1
+
+  def unload(self, model_name=None, force=False):
+    # zwalnia wagi, których nikt już nie używa (albo wszystkie przy force=True)
+    with self._lock:
+      keys = [
+        key for key, entry in self._entries.items()
+        if (model_name is None or key[0] == model_name) and (force or entry.references == 0)
+      ]
+      for key in keys:
+        del self._entries[key]
+
+    if keys:
+      gc.collect()
+      if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+      print(f"[ModelRegistry] Unloaded {len(keys)} model(s)")
+    return len(keys)
+
+  def loaded_models(self):
+    with self._lock:
+      return {f"{name} ({device}, {quantization})": entry.references
+              for (name, device, quantization), entry in self._entries.items()}
+
+  def _load(self, model_name, device, quantization):
+    print(f"[ModelRegistry] Loading {model_name} on {device}")
+    tokenizer = AutoTokenizer.from_pretrained(
+      model_name,
+      local_files_only=True,
+      trust_remote_code=True
+    )
+    if tokenizer.pad_token is None:
+      tokenizer.pad_token = tokenizer.eos_token
+    tokenizer.padding_side = "left"
+
+    model = AutoModelForCausalLM.from_pretrained(
+      model_name,
+      torch_dtype=torch.float16 if device == "cuda" else torch.float32,
+      trust_remote_code=True,
+      device_map=device,
+      local_files_only=True
+    )
+
+    if quantization == "dynamic_int8":
+      if device == "cpu":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        print("[Model] Using dynamic int8 quantization of Linear layers")
+      else:
+        print("[Model] dynamic_int8 quantization is CPU-only, keeping float16 weights")
+    elif quantization != "none":
+      print(f"[Model] Unknown quantization mode '{quantization}', using full precision")
+
+    if torch.__version__ >= "2.0" and device == "cuda":
+      model = torch.compile(model)
+
+    return model, tokenizer
+
+model_registry = ModelRegistry()
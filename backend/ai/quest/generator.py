@@ -1,36 +1,38 @@
-import torch, json, random, time, re
-from transformers import AutoModelForCausalLM, AutoTokenizer
+import torch, json, random, time, re, threading
+from ai.model_registry import model_registry, default_device, DEFAULT_MODEL_NAME
+from ai.dialog.config_loader import ConfigLoader
 
 class QuestGenerator:
   def __init__(self, dialog_engine=None):
+    self.owns_model = False
+    self.dialog_engine = dialog_engine
+    self.model, self.tokenizer = None, None
+    self.load_error = None
+    self._ready = threading.Event()
+    self._load_thread = None
+
     if dialog_engine:
-      self.model = dialog_engine.model
-      self.tokenizer = dialog_engine.tokenizer
       self.device = dialog_engine.device
       self.characters = dialog_engine.characters
       self.world_lore = dialog_engine.world_lore
+      lazy = not dialog_engine.is_ready()
     else:
-      self.model_name = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
-      self.device = "cuda" if torch.cuda.is_available() else "cpu"
-      
-      self.tokenizer = AutoTokenizer.from_pretrained(
-        self.model_name,
-        local_files_only=True,
-        trust_remote_code=True
-      )
-      if self.tokenizer.pad_token is None:
-        self.tokenizer.pad_token = self.tokenizer.eos_token
-        
-      self.model = AutoModelForCausalLM.from_pretrained(
-        self.model_name,
-        torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
-        trust_remote_code=True,
-        device_map=self.device,
-        local_files_only=True
-      )
+      self.model_name = DEFAULT_MODEL_NAME
+      self.device = default_device()
+      config = ConfigLoader().load_config()
+      # ta sama kwantyzacja co w DialogEngine, żeby rejestr oddał tę samą kopię wag
+      self.quantization = config.get("inference", {}).get("quantization", "none")
+      lazy = config.get("inference", {}).get("lazy_load", False)
       
-      self.characters = {}
-      self.world_lore = {}
+      self.characters = config.get("characters", {})
+      self.world_lore = config.get("world_lore", {})
+
+    if lazy:
+      self._load_thread = threading.Thread(target=self._load_in_background, name="quest-model-loader", daemon=True)
+      self._load_thread.start()
+    else:
+      self._load_model()
+      self._ready.set()
 
     self.quest_types = {
       "investigation": {
@@ -61,11 +63,44 @@ class QuestGenerator:
     }
     
     self.generated_quests = {}
+    # quest-worker dopisuje questy, a wątki zapytań w tym czasie sprzątają stare
+    self._quests_lock = threading.Lock()
+
+  def _load_model(self):
+    if self.dialog_engine:
+      self.dialog_engine.wait_until_ready()
+      self.model, self.tokenizer = self.dialog_engine.model, self.dialog_engine.tokenizer
+    else:
+      self.model, self.tokenizer = model_registry.acquire(self.model_name, self.device, self.quantization)
+      self.owns_model = True
+
+  def _load_in_background(self):
+    try:
+      self._load_model()
+    except Exception as e:
+      self.load_error = e
+      print(f"Quest model loading failed: {e}")
+    finally:
+      self._ready.set()
+
+  def is_ready(self):
+    return self._ready.is_set() and self.load_error is None
+
+  def wait_until_ready(self, timeout=None):
+    if not self._ready.wait(timeout):
+      raise RuntimeError("Quest model is still loading")
+    if self.load_error is not None:
+      raise RuntimeError(f"Quest model failed to load: {self.load_error}")
+
+  def close(self):
+    if self._load_thread:
+      self._load_thread.join()
+      self._load_thread = None
+    if self.owns_model:
+      model_registry.release(self.model_name, self.device, self.quantization)
+      self.owns_model = False
     
-  def generate_quest(self, quest_type=None, player_level=1, world_context=None):
-    if not quest_type:
-      quest_type = random.choice(list(self.quest_types.keys()))
-    
+  def _build_quest_prompt(self, quest_type, player_level):
     world_info = ""
     if hasattr(self, 'world_lore') and self.world_lore:
       world_info = f"World: {self.world_lore.get('village_name', 'Stonehaven')}\n"
@@ -101,7 +136,44 @@ Reward: 75 gold pieces
 Generate quest:
 Title:"""
 
+    return prompt, difficulty
+
+  def _generation_kwargs(self):
+    return {
+      "max_new_tokens": 150,
+      "temperature": 0.8,
+      "top_k": 50,
+      "top_p": 0.9,
+      "do_sample": True,
+      "repetition_penalty": 1.5,
+      "pad_token_id": self.tokenizer.eos_token_id,
+      "eos_token_id": self.tokenizer.eos_token_id
+    }
+
+  def _finish_quest(self, full_text, quest_type, difficulty, player_level):
+    quest_text = full_text.split("Generate quest:")[-1].strip()
+    quest = self.parse_generated_quest(quest_text, quest_type, difficulty, player_level)
+    if not quest:
+      return self.generate_template_quest(quest_type, player_level)
+
+    # w batchu kilka questów powstaje w tej samej sekundzie, więc pilnujemy unikalnych id
+    quest["steps"] = self.generate_quest_steps(quest_type, difficulty)
+    with self._quests_lock:
+      quest_id = f"ai_quest_{int(time.time())}_{random.randint(100, 999)}"
+      while quest_id in self.generated_quests:
+        quest_id = f"ai_quest_{int(time.time())}_{random.randint(100, 999)}"
+      quest["id"] = quest_id
+      self.generated_quests[quest_id] = quest
+    return quest
+
+  def generate_quest(self, quest_type=None, player_level=1, world_context=None):
+    if not quest_type:
+      quest_type = random.choice(list(self.quest_types.keys()))
+
+    prompt, difficulty = self._build_quest_prompt(quest_type, player_level)
+
     try:
+      self.wait_until_ready()
       inputs = self.tokenizer(
         prompt,
         return_tensors="pt",
@@ -111,34 +183,10 @@ Title:"""
       ).to(self.device)
       
       with torch.no_grad():
-        output = self.model.generate(
-          **inputs,
-          max_new_tokens=150,
-          temperature=0.8,
-          top_k=50,
-          top_p=0.9,
-          do_sample=True,
-          repetition_penalty=1.5,
-          pad_token_id=self.tokenizer.eos_token_id,
-          eos_token_id=self.tokenizer.eos_token_id
-        )
+        output = self.model.generate(**inputs, **self._generation_kwargs())
       
       full_text = self.tokenizer.decode(output[0], skip_special_tokens=True)
-      quest_text = full_text.split("Generate quest:")[-1].strip()
-      quest = self.parse_generated_quest(quest_text, quest_type, difficulty, player_level)
-      
-      if quest:
-        quest_id = f"ai_quest_{int(time.time())}_{random.randint(100, 999)}"
-        quest["id"] = quest_id
-        
-        quest["steps"] = self.generate_quest_steps(quest_type, difficulty)
-        
-        self.generated_quests[quest_id] = quest
-        quest["id"] = quest_id
-        self.generated_quests[quest_id] = quest
-        return quest
-      else:
-        return self.generate_template_quest(quest_type, player_level)
+      return self._finish_quest(full_text, quest_type, difficulty, player_level)
         
     except Exception as e:
       print(f"Quest generation error: {e}")
@@ -354,16 +402,42 @@ Title:"""
       "steps": self.generate_quest_steps(quest_type, "medium")
     }
     
-    self.generated_quests[quest_id] = quest
+    with self._quests_lock:
+      self.generated_quests[quest_id] = quest
     return quest
 
   def get_all_available_quests(self, player_level=1, max_quests=5):
+    quest_types = [random.choice(list(self.quest_types.keys())) for _ in range(max_quests)]
+    if not quest_types:
+      return []
+
+    prompts = [self._build_quest_prompt(quest_type, player_level) for quest_type in quest_types]
+
+    # wszystkie prompty w jednym generate; tokenizer z rejestru dopełnia je z lewej
+    try:
+      self.wait_until_ready()
+      inputs = self.tokenizer(
+        [prompt for prompt, _ in prompts],
+        return_tensors="pt",
+        padding=True,
+        truncation=True,
+        max_length=400
+      ).to(self.device)
+
+      with torch.no_grad():
+        output = self.model.generate(**inputs, **self._generation_kwargs())
+    except Exception as e:
+      print(f"Batched quest generation error: {e}")
+      return [self.generate_template_quest(quest_type, player_level) for quest_type in quest_types]
+
     quests = []
-    quest_types = list(self.quest_types.keys())
-    
-    for i in range(max_quests):
-      quest_type = random.choice(quest_types)
-      quest = self.generate_quest(quest_type, player_level)
+    for row, quest_type, (_, difficulty) in zip(output, quest_types, prompts):
+      full_text = self.tokenizer.decode(row, skip_special_tokens=True)
+      try:
+        quest = self._finish_quest(full_text, quest_type, difficulty, player_level)
+      except Exception as e:
+        print(f"Quest generation error: {e}")
+        quest = self.generate_template_quest(quest_type, player_level)
       if quest:
         quests.append(quest)
     
@@ -373,11 +447,12 @@ Title:"""
     current_time = time.time()
     old_quest_ids = []
     
-    for quest_id, quest in self.generated_quests.items():
-      if current_time - quest.get("generated_at", 0) > 86400:
-        old_quest_ids.append(quest_id)
-    
-    for quest_id in old_quest_ids:
-      del self.generated_quests[quest_id]
+    with self._quests_lock:
+      for quest_id, quest in self.generated_quests.items():
+        if current_time - quest.get("generated_at", 0) > 86400:
+          old_quest_ids.append(quest_id)
+      
+      for quest_id in old_quest_ids:
+        del self.generated_quests[quest_id]
     
     print(f"Cleaned {len(old_quest_ids)} old quests")
@@ -1,22 +1,45 @@
 from flask import Flask
 from flask_cors import CORS
-from game.player import Player
+from game.player_store import PlayerStore, SqlitePlayerBackend
 from game.quest_system import QuestSystem
 from game.crafting_system import CraftingSystem
 from ai.dialog.engine import DialogEngine
+from ai.dialog.config_loader import ConfigLoader
+from ai.config_service import config_service
+from ai.dialog.worker_pool import InferenceWorkerPool
 import json
 
 from routes.api_routes import api_bp
+from routes.player_context import release_player
 
 def create_app():
   app = Flask(__name__)
-  CORS(app)  
+  # ciasteczko sesji niesie identyfikator gracza, więc frontend z innego portu musi je wysyłać
+  CORS(app, supports_credentials=True)
   app.secret_key = 'your_secret_key'
 
-  dialog_engine = DialogEngine()
-  quest_system = QuestSystem(dialog_engine)
+  config = ConfigLoader().load_config()
+  workers = config.get("inference", {}).get("workers", {})
+  if workers.get("count", 0) > 0:
+    # dialogi obsługują osobne procesy, questy korzystają z własnej kopii modelu w procesie Flaska
+    dialog_engine = InferenceWorkerPool(
+      workers["count"],
+      threads_per_worker=workers.get("threads_per_worker"),
+      max_concurrency=workers.get("max_concurrency", 4),
+      request_timeout=workers.get("request_timeout", 120)
+    )
+    quest_system = QuestSystem()
+  else:
+    dialog_engine = DialogEngine()
+    quest_system = QuestSystem(dialog_engine)
   crafting_system = CraftingSystem()
-  player = Player(name="Demo")
+  players = config.get("players", {})
+  # każdy gracz ma własny stan; w pamięci trzymamy tylko ostatnio aktywnych, reszta czeka w SQLite
+  player_store = PlayerStore(
+    SqlitePlayerBackend(players.get("sqlite_path", "data/players.db")) if players.get("backend", "sqlite") == "sqlite" else None,
+    max_players=players.get("max_in_memory", 1000),
+    idle_timeout=players.get("idle_timeout", 1800)
+  )
 
   try:
     with open('merchant_inventory.json', 'r') as f:
@@ -24,15 +47,23 @@ def create_app():
   except FileNotFoundError:
     merchant_inventory_data = []
 
-  app.config['PLAYER'] = player
+  app.config['PLAYER_STORE'] = player_store
+  app.config['ALLOW_CLIENT_PLAYER_IDS'] = players.get("allow_client_ids", False)
   app.config['DIALOG_ENGINE'] = dialog_engine
   app.config['QUEST_SYSTEM'] = quest_system
   app.config['CRAFTING_SYSTEM'] = crafting_system
   app.config['MERCHANT_INVENTORY'] = merchant_inventory_data
   app.register_blueprint(api_bp, url_prefix='/api')
+  app.teardown_request(release_player)
+
+  reload = config.get("reload", {})
+  if reload.get("enabled", False):
+    # zmiany w plikach YAML trafiają do działającego serwera bez restartu (i bez przeładowania modelu)
+    config_service.start(reload.get("interval_seconds", 2.0))
     
   return app
 
 if __name__ == "__main__":
   app = create_app()
-  app.run(debug=True)
\ No newline at end of file
+  # reloader uruchomiłby drugi komplet procesów z modelami
+  app.run(debug=True, use_reloader=not isinstance(app.config['DIALOG_ENGINE'], InferenceWorkerPool))
\ No newline at end of file
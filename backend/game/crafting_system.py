@@ -1,17 +1,21 @@
 import yaml, os
+from ai.config_service import config_service
 
 class CraftingSystem:
 	def __init__(self):
 		self.recipes = {}
 		self.available_materials = {}
 		self._load_crafting_config()
+		config_service.subscribe(self._crafting_path(), self._on_crafting_change)
+	
+	def _crafting_path(self):
+		return os.path.join(os.path.dirname(__file__), '..', 'config', 'crafting.yaml')
 	
 	def _load_crafting_config(self):
-		config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'crafting.yaml')
+		config_path = self._crafting_path()
 		
 		try:
-			with open(config_path, 'r', encoding='utf-8') as file:
-				config = yaml.safe_load(file)
+			config = config_service.get(config_path)
 
 			if 'recipes' in config:
 				self.recipes = config['recipes']
@@ -23,6 +27,11 @@ class CraftingSystem:
 		except yaml.YAMLError as e:
 			print(f"Error parsing crafting configuration: {e}")
 	
+	def _on_crafting_change(self, config):
+		self.recipes = config.get('recipes', {})
+		self.available_materials = config.get('materials', {})
+		print(f"[CraftingSystem] Reloaded {len(self.recipes)} recipes")
+	
 	def get_available_recipes(self, player_level):
 		available = {}
 		for recipe_id, recipe in self.recipes.items():
@@ -176,5 +176,29 @@ class Player:
       'totalArmor': self.get_total_armor()
     }
 
+  def to_state(self):
+    # pełny stan do zapisu w PlayerStore; progi doświadczenia są stałe, więc ich nie zapisujemy
+    state = {}
+    set_fields = []
+    for key, value in vars(self).items():
+      if key == 'experience_thresholds':
+        continue
+      if isinstance(value, set):
+        set_fields.append(key)
+        value = sorted(value)
+      state[key] = value
+    state['_set_fields'] = set_fields
+    return state
+
+  @classmethod
+  def from_state(cls, state):
+    player = cls(state.get('name', 'Demo'))
+    set_fields = state.get('_set_fields', [])
+    for key, value in state.items():
+      if key == '_set_fields':
+        continue
+      setattr(player, key, set(value) if key in set_fields else value)
+    return player
+
   def __repr__(self):
     return f"Player({self.name}, Level: {self.level}, Gold: {self.gold})"
\ No newline at end of file
@@ -0,0 +1,115 @@
+import json, os, sqlite3, threading, time
+from collections import OrderedDict
+from game.player import Player
+
+class SqlitePlayerBackend:
+  def __init__(self, path="data/players.db"):
+    self.path = path
+    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+    self._lock = threading.Lock()
+    self._conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+    self._conn.execute("PRAGMA journal_mode=WAL")
+    self._conn.execute(
+      "CREATE TABLE IF NOT EXISTS players (player_id TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+    )
+
+  def load(self, player_id):
+    with self._lock:
+      row = self._conn.execute("SELECT state FROM players WHERE player_id = ?", (player_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+  def save(self, player_id, state):
+    with self._lock, self._conn:
+      self._conn.execute(
+        "INSERT INTO players (player_id, state, updated_at) VALUES (?, ?, ?) "
+        "ON CONFLICT(player_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+        (player_id, json.dumps(state), time.time())
+      )
+
+  def close(self):
+    with self._lock:
+      self._conn.close()
+
+class _PlayerEntry:
+  def __init__(self, player):
+    self.player = player
+    self.lock = threading.RLock()
+    self.users = 0
+    self.last_access = time.monotonic()
+    self.dirty = False
+
+class PlayerStore:
+  def __init__(self, backend=None, max_players=1000, idle_timeout=1800):
+    self.backend = backend
+    self.max_players = max(1, int(max_players))
+    self.idle_timeout = idle_timeout
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  def checkout(self, player_id, name=None):
+    # zwraca wpis gracza przypięty do bieżącego zapytania; wywołujący trzyma entry.lock do release()
+    with self._lock:
+      entry = self._entries.get(player_id)
+      if entry is not None:
+        evicted = self._pin_locked(player_id, entry)
+    if entry is None:
+      # odczyt z SQLite poza blokadą sklepu, żeby zimny gracz nie wstrzymywał pozostałych
+      state = self.backend.load(player_id) if self.backend else None
+      loaded = _PlayerEntry(Player.from_state(state) if state else Player(name=name or player_id))
+      with self._lock:
+        # ktoś mógł wczytać tego samego gracza w międzyczasie - wygrywa wpis, który już jest
+        entry = self._entries.setdefault(player_id, loaded)
+        evicted = self._pin_locked(player_id, entry)
+    self._save_evicted(evicted)
+    return entry
+
+  def release(self, player_id, entry, save=True):
+    # save=True znaczy "zapytanie mogło zmienić stan"; odczyty nie piszą do bazy
+    if save:
+      entry.dirty = True
+    if entry.dirty and self.backend:
+      self._save(player_id, entry)
+    with self._lock:
+      entry.users -= 1
+      entry.last_access = time.monotonic()
+
+  def _save(self, player_id, entry):
+    try:
+      self.backend.save(player_id, entry.player.to_state())
+      entry.dirty = False
+    except Exception as e:
+      # wpis zostaje brudny, spróbujemy przy następnym zapisie albo przy wyrzuceniu z pamięci
+      print(f"[PlayerStore] Could not save player {player_id}: {e}")
+
+  def _pin_locked(self, player_id, entry):
+    self._entries.move_to_end(player_id)
+    entry.users += 1
+    entry.last_access = time.monotonic()
+    return self._evict_locked()
+
+  def _evict_locked(self):
+    # najdłużej nieużywani gracze są na początku; bez backendu ich stan przepada razem z wpisem
+    now = time.monotonic()
+    evicted = []
+    for player_id in list(self._entries):
+      entry = self._entries[player_id]
+      over_limit = len(self._entries) > self.max_players
+      idle = now - entry.last_access > self.idle_timeout
+      if not over_limit and not idle:
+        break
+      if entry.users == 0:
+        del self._entries[player_id]
+        if entry.dirty:
+          evicted.append((player_id, entry))
+    return evicted
+
+  def _save_evicted(self, evicted):
+    if not self.backend:
+      return
+    for player_id, entry in evicted:
+      with entry.lock:
+        self._save(player_id, entry)
+
+  def active_players(self):
+    with self._lock:
+      return len(self._entries)
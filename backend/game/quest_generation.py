@@ -1,16 +1,20 @@
-import time, yaml, os
+import time, yaml, os, random
+from ai.config_service import config_service
 
 class QuestGeneration:
   def __init__(self):
     self.quest_templates = {}
     self._load_quest_templates()
+    config_service.subscribe(self._quest_templates_path(), self._on_quest_templates_change)
+
+  def _quest_templates_path(self):
+    return os.path.join(os.path.dirname(__file__), '..', 'config', 'quest_templates.yaml')
     
   def _load_quest_templates(self):
-    config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'quest_templates.yaml')
+    config_path = self._quest_templates_path()
     
     try:
-      with open(config_path, 'r', encoding='utf-8') as file:
-        config = yaml.safe_load(file)
+      config = config_service.get(config_path)
         
       if 'quest_templates' in config:
         self.quest_templates = config['quest_templates']
@@ -20,20 +24,29 @@ class QuestGeneration:
     except yaml.YAMLError as e:
       print(f"Error parsing quest templates configuration: {e}")
 
+  def _on_quest_templates_change(self, config):
+    self.quest_templates = config.get('quest_templates', {})
+    print(f"[QuestGeneration] Reloaded {len(self.quest_templates)} quest templates")
+
   def _pre_generate_quests(self):
-    print("Pre-generating initial quest pool...")
+    print("Seeding quest pool with template quests...")
     self.quest_generator.clean_old_quests()
-
-    for level in range(1, 4):  
-      new_quests = self.quest_generator.get_all_available_quests(level, max_quests=1)
-      for quest in new_quests:
-        self.generated_quests_cache[quest["id"]] = quest
     
     template_quests = self._generate_quick_template_quests()
     for quest in template_quests:
       self.generated_quests_cache[quest["id"]] = quest
-        
-    print(f"Pre-generated {len(self.generated_quests_cache)} quests")
+
+    # questy AI generuje wątek w tle, start serwera na nie nie czeka
+    self.quest_worker.start()
+    print(f"Seeded {len(self.generated_quests_cache)} quests, AI quests are generated in the background")
+
+  def _publish_quests(self, quests):
+    for quest in quests:
+      self.generated_quests_cache[quest["id"]] = quest
+
+  def _publish_ready_quests(self):
+    # questy gotowe od workera trafiają do cache dopiero w wątku zapytania
+    self._publish_quests(self.quest_worker.take_published())
     
   def _generate_quick_template_quests(self):
     templates = []
@@ -58,40 +71,45 @@ class QuestGeneration:
     current_time = time.time()
 
     if force or (current_time - self.last_quest_generation) > 1800:  
-      print("Generating new AI quests...")
+      print("Publishing new AI quests...")
 
       self.quest_generator.clean_old_quests()
-      new_quests = self.quest_generator.get_all_available_quests(player_level, max_quests=5)
-      for quest in new_quests:
-        self.generated_quests_cache[quest["id"]] = quest
+      new_quests = self.quest_worker.take(player_level, 5)
+      self._publish_quests(new_quests)
       
       self.last_quest_generation = current_time
-      print(f"Generated {len(new_quests)} new quests")
+      print(f"Published {len(new_quests)} new quests")
         
   def manual_refresh_quests(self, player_level=1):
     print("Manually refreshing quest pool...")
     current_time = time.time()
     
     self.quest_generator.clean_old_quests()
-    new_quests = self.quest_generator.get_all_available_quests(player_level, max_quests=3)
-    
-    for quest in new_quests:
-      self.generated_quests_cache[quest["id"]] = quest
+    new_quests = self.quest_worker.take(player_level, 3)
+    self._publish_quests(new_quests)
     
     self.last_quest_generation = current_time
-    print(f"Manually generated {len(new_quests)} new quests")
+    print(f"Manually published {len(new_quests)} new quests")
     return len(new_quests)
     
   def maintain_quest_pool(self, player_level=1):
-    current_available = len([q for q in self.generated_quests_cache.values() 
+    current_available = len([q for q in list(self.generated_quests_cache.values()) 
                             if q.get('reward_gold', 0) > 0]) 
     if current_available < 8:
-      additional_quests = self.quest_generator.get_all_available_quests(
-        player_level, max_quests=3
-      )
-      for quest in additional_quests:
-        self.generated_quests_cache[quest["id"]] = quest
+      additional_quests = self.quest_worker.take(player_level, 3)
+      self._publish_quests(additional_quests)
       print(f"Maintained quest pool: added {len(additional_quests)} quests")
+
+  def take_generated_quest(self, player_level=1, quest_type=None):
+    quests = self.quest_worker.take(player_level, 1, quest_type)
+    if quests:
+      quest = quests[0]
+    else:
+      # nic gotowego w tym poziomie - od razu zwracamy quest z szablonu, worker dorobi zapas
+      quest_type = quest_type or random.choice(list(self.quest_generator.quest_types.keys()))
+      quest = self.quest_generator.generate_template_quest(quest_type, player_level)
+    self._publish_quests([quest])
+    return quest
         
   def quick_generate_quests(self, player_level=1, count=3):
     print(f"Quick-generating {count} template quests...")
@@ -18,7 +18,8 @@ class QuestManagement:
         if self._meets_requirements(quest, player):
           available.append(quest)
 
-    for quest_id, quest in self.generated_quests_cache.items():
+    self._publish_ready_quests()
+    for quest_id, quest in list(self.generated_quests_cache.items()):
       if (player.name not in quest["completed_by"] and 
           not player.has_completed_quest(quest_id)):
         quest_type = quest.get('type', 'investigation')
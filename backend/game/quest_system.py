@@ -1,4 +1,6 @@
-import time, random, yaml, os
+import time, random, os, copy
+
+from ai.config_service import config_service
 
 from ai.quest.generator import QuestGenerator
 from game.quest_management import QuestManagement
@@ -6,23 +8,37 @@ from game.quest_generation import QuestGeneration
 from game.quest_completion import QuestCompletion
 from game.quest_progress import QuestProgress
 from game.quest_actions import QuestActions
+from game.quest_worker import QuestWorker
 
 class QuestSystem(QuestManagement, QuestGeneration, QuestCompletion, QuestProgress, QuestActions):
   def __init__(self, dialog_engine=None):
     QuestGeneration.__init__(self)
     
     self.quest_generator = QuestGenerator(dialog_engine)
+    self.quest_worker = QuestWorker(self.quest_generator)
     self.generated_quests_cache = {}
     self.last_quest_generation = 0
     self.quests = self._load_static_quests()
+    config_service.subscribe(self._quests_path(), self._on_quests_change)
     self.action_locations = self._init_action_locations()
     self._pre_generate_quests()
     
-  def _load_static_quests(self):
-    config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'quests.yaml')
-    with open(config_path, 'r') as f:
-      data = yaml.safe_load(f)
-    return {q['id']: q for q in data.get('quests', [])}
+  def _quests_path(self):
+    return os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config', 'quests.yaml')
+
+  def _load_static_quests(self, data=None):
+    if data is None:
+      data = config_service.get(self._quests_path())
+    # completed_by zmienia się w trakcie gry, więc nie ruszamy współdzielonego obiektu z config_service
+    return {q['id']: copy.deepcopy(q) for q in data.get('quests', [])}
+
+  def _on_quests_change(self, data):
+    quests = self._load_static_quests(data)
+    for quest_id, quest in quests.items():
+      if quest_id in self.quests:
+        quest['completed_by'] = self.quests[quest_id].get('completed_by', [])
+    self.quests = quests
+    print(f"[QuestSystem] Reloaded {len(quests)} static quests")
 
   def _init_action_locations(self):
     return {
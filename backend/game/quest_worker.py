@@ -0,0 +1,100 @@
+import atexit, threading
+from collections import deque
+
+class QuestWorker:
+  def __init__(self, quest_generator, levels=(1, 2, 3), target_per_level=3, batch_size=3, max_level=10, idle_interval=60):
+    self.quest_generator = quest_generator
+    self.target_per_level = target_per_level
+    self.batch_size = batch_size
+    self.max_level = max_level
+    self.idle_interval = idle_interval
+
+    self.ready = {}
+    # pierwsze questy z każdego poziomu od razu trafiają do puli, tak jak przy dawnym pre-generowaniu;
+    # do cache przenosi je wątek zapytania (take_published), worker nie dotyka słowników QuestSystem
+    self.auto_publish = {}
+    self.published = deque()
+    self._lock = threading.Lock()
+    self._wake = threading.Event()
+    self._stop = threading.Event()
+    self._thread = threading.Thread(target=self._run, name="quest-worker", daemon=True)
+
+    for level in levels:
+      self.ready[self.level_bucket(level)] = deque()
+      self.auto_publish[self.level_bucket(level)] = 1
+
+  def level_bucket(self, player_level):
+    return max(1, min(int(player_level), self.max_level))
+
+  def start(self):
+    if not self._thread.is_alive():
+      self._thread.start()
+      atexit.register(self.stop)
+
+  def stop(self, timeout=5):
+    self._stop.set()
+    self._wake.set()
+    if self._thread.is_alive():
+      self._thread.join(timeout)
+
+  def take(self, player_level, count=1, quest_type=None):
+    bucket = self.level_bucket(player_level)
+    taken = []
+    with self._lock:
+      ready = self.ready.setdefault(bucket, deque())
+      for quest in list(ready):
+        if len(taken) >= count:
+          break
+        if quest_type is None or quest.get("type") == quest_type:
+          ready.remove(quest)
+          taken.append(quest)
+    self._wake.set()
+    return taken
+
+  def take_published(self):
+    with self._lock:
+      quests = list(self.published)
+      self.published.clear()
+    return quests
+
+  def pending_counts(self):
+    with self._lock:
+      return {bucket: len(quests) for bucket, quests in self.ready.items()}
+
+  def _next_bucket(self):
+    with self._lock:
+      missing = {bucket: self.target_per_level - len(quests) for bucket, quests in self.ready.items()}
+    bucket = max(missing, key=missing.get, default=None)
+    if bucket is None or missing[bucket] <= 0:
+      return None, 0
+    return bucket, min(missing[bucket], self.batch_size)
+
+  def _run(self):
+    while not self._stop.is_set():
+      # przy leniwym starcie czekamy na model, do tego czasu pulę wypełniają szablony
+      if not self.quest_generator.is_ready() and self.quest_generator.load_error is None:
+        self._stop.wait(1)
+        continue
+
+      bucket, count = self._next_bucket()
+      if not bucket:
+        self._wake.wait(self.idle_interval)
+        self._wake.clear()
+        continue
+
+      try:
+        quests = self.quest_generator.get_all_available_quests(bucket, max_quests=count)
+      except Exception as e:
+        print(f"[QuestWorker] Generation failed for level {bucket}: {e}")
+        self._stop.wait(5)
+        continue
+
+      with self._lock:
+        for quest in quests:
+          if self.auto_publish.get(bucket, 0) > 0:
+            self.auto_publish[bucket] -= 1
+            self.published.append(quest)
+          else:
+            self.ready[bucket].append(quest)
+
+      print(f"[QuestWorker] Generated {len(quests)} quests for level {bucket}")
@@ -1,4 +1,5 @@
 from flask import Blueprint, jsonify, request, current_app
+from .player_context import current_player
 import random
 
 from .forest_routes import handle_forest_action
@@ -14,7 +15,7 @@ def perform_action():
   location = data.get('location', '')
   action = data.get('action', '')
   
-  player = current_app.config['PLAYER']
+  player = current_player()
   quest_system = current_app.config['QUEST_SYSTEM']
 
   if location == 'forest':
@@ -1,6 +1,6 @@
 from flask import Blueprint
 from .player_routes import player_bp, get_player, update_player, get_inventory
-from .dialog_routes import dialog_bp, send_dialog_message, conversation_stats, quality_report, session_stats, get_dialog_history
+from .dialog_routes import dialog_bp, send_dialog_message, stream_dialog_message, dialog_status, conversation_stats, quality_report, session_stats, get_dialog_history
 from .quest_routes import ( quest_bp, get_available_quests, get_active_quests, generate_quest, refresh_quests, 
   accept_quest, abandon_quest, get_quest_progress, get_quest_actions_for_location, perform_quest_action,
   debug_completed_quests, debug_reset_completed, debug_force_regenerate )
@@ -31,6 +31,8 @@ api_bp.add_url_rule("/inventory/use", "inventory_use_item", inventory_use_item,
 api_bp.add_url_rule("/inventory/unequip", "inventory_unequip_item", inventory_unequip_item, methods=['POST'])
 
 api_bp.add_url_rule("/dialog", "send_dialog_message", send_dialog_message, methods=['POST'])
+api_bp.add_url_rule("/dialog/stream", "stream_dialog_message", stream_dialog_message, methods=['POST'])
+api_bp.add_url_rule("/dialog/status", "dialog_status", dialog_status, methods=['GET'])
 api_bp.add_url_rule("/conversation_stats", "conversation_stats", conversation_stats)
 api_bp.add_url_rule("/quality_report", "quality_report", quality_report)
 api_bp.add_url_rule("/session_stats/<session_id>", "session_stats", session_stats)
@@ -1,10 +1,35 @@
-from flask import Blueprint, jsonify, request, current_app
+import json
+from flask import Blueprint, Response, jsonify, request, current_app, stream_with_context
 
 dialog_bp = Blueprint('dialog', __name__)
 
+WARMING_UP_TEXT = "*The villager is still rubbing the sleep from their eyes* Give me a moment, traveler, and ask again."
+
+FAILED_TEXT = "*The villager stares blankly, lost in thought* I... cannot speak right now, traveler."
+
+def _unavailable_response(dialog_engine):
+  # nieudane ładowanie to co innego niż rozgrzewka - klient nie powinien ponawiać w nieskończoność
+  load_error = getattr(dialog_engine, 'load_error', None)
+  if load_error is not None:
+    return jsonify({
+      'speaker': 'NPC',
+      'text': FAILED_TEXT,
+      'options': [],
+      'status': 'failed',
+      'error': str(load_error)
+    }), 503
+  return jsonify({
+    'speaker': 'NPC',
+    'text': WARMING_UP_TEXT,
+    'options': [],
+    'status': 'warming_up'
+  }), 503
+
 @dialog_bp.route("/dialog", methods=['POST'])
 def send_dialog_message():
   dialog_engine = current_app.config['DIALOG_ENGINE']
+  if not dialog_engine.is_ready():
+    return _unavailable_response(dialog_engine)
   data = request.get_json()
   
   session_id = data.get('session_id', 'default')
@@ -18,6 +43,44 @@ def send_dialog_message():
     'options': response.get('options', [])
   })
 
+@dialog_bp.route("/dialog/stream", methods=['POST'])
+def stream_dialog_message():
+  dialog_engine = current_app.config['DIALOG_ENGINE']
+  if not dialog_engine.is_ready():
+    return _unavailable_response(dialog_engine)
+  data = request.get_json()
+  
+  session_id = data.get('session_id', 'default')
+  message = data.get('message', '')
+  context = data.get('context', {})
+  character = context.get('character', 'tavern_keeper')
+  player_stats = context.get('player_stats')
+
+  # zdarzenia "token" niosą surowy tekst w trakcie generowania, "done" - ostateczną, oczyszczoną odpowiedź
+  def generate_events():
+    for event in dialog_engine.stream_npc_response(message, character, session_id, player_stats):
+      payload = {'speaker': 'NPC', 'type': event['type'], 'text': event['text']}
+      yield f"data: {json.dumps(payload)}\n\n"
+
+  return Response(
+    stream_with_context(generate_events()),
+    mimetype='text/event-stream',
+    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+  )
+
+@dialog_bp.route("/dialog/status")
+def dialog_status():
+  dialog_engine = current_app.config['DIALOG_ENGINE']
+  quest_system = current_app.config['QUEST_SYSTEM']
+  dialog_error = getattr(dialog_engine, 'load_error', None)
+  quests_error = quest_system.quest_generator.load_error
+  return jsonify({
+    'dialog_ready': dialog_engine.is_ready(),
+    'quests_ready': quest_system.quest_generator.is_ready(),
+    'load_error': str(dialog_error) if dialog_error is not None else None,
+    'quests_load_error': str(quests_error) if quests_error is not None else None
+  })
+
 @dialog_bp.route("/conversation_stats")
 def conversation_stats():
   dialog_engine = current_app.config['DIALOG_ENGINE']
@@ -39,20 +102,26 @@ def session_stats(session_id):
 @dialog_bp.route("/dialog/<session_id>/history", methods=['GET'])
 def get_dialog_history(session_id):
   dialog_engine = current_app.config['DIALOG_ENGINE']
-  history = dialog_engine.conversation_history.get(session_id, [])
+  if not dialog_engine.is_ready():
+    return _unavailable_response(dialog_engine)
+  try:
+    history = dialog_engine.conversation_history.session_turns(session_id)
+  except RuntimeError as e:
+    # historia z workerów: martwy albo zawieszony worker nie może blokować wątku Flaska
+    return jsonify({'error': str(e)}), 503
   messages = []
-  for entry in history:
-    if isinstance(entry, dict):
+  for character, turns in history.items():
+    for turn in turns:
       messages.append({
-        'speaker': entry.get('speaker', 'Unknown'),
-        'text': entry.get('text', ''),
-        'timestamp': entry.get('timestamp', None)
+        'speaker': 'Player',
+        'text': turn.get('user', ''),
+        'timestamp': turn.get('timestamp', None)
       })
-    else:
       messages.append({
-        'speaker': 'System',
-        'text': str(entry),
-        'timestamp': None
+        'speaker': 'NPC',
+        'text': turn.get('npc', ''),
+        'timestamp': turn.get('timestamp', None)
       })
+  messages.sort(key=lambda message: message['timestamp'] or 0)
   
   return jsonify(messages)
@@ -1,4 +1,5 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request
+from .player_context import current_player
 import random
 
 forest_bp = Blueprint('forest', __name__)
@@ -7,7 +8,7 @@ forest_bp = Blueprint('forest', __name__)
 def forest_action():
 	data = request.get_json()
 	action = data.get('action', '')
-	player = current_app.config['PLAYER']
+	player = current_player()
 	
 	return handle_forest_action(player, action, data)
 
@@ -1,4 +1,5 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request
+from .player_context import current_player
 
 inventory_bp = Blueprint('inventory', __name__)
 
@@ -163,7 +164,7 @@ def handle_inventory_action(player, action, data):
 @inventory_bp.route("/use", methods=['POST'])
 def inventory_use_item():
   data = request.get_json()
-  player = current_app.config['PLAYER']
+  player = current_player()
   
   result = handle_inventory_action(player, 'use', data)
   return jsonify(result)
@@ -171,7 +172,7 @@ def inventory_use_item():
 @inventory_bp.route("/unequip", methods=['POST'])
 def inventory_unequip_item():
   data = request.get_json()
-  player = current_app.config['PLAYER']
+  player = current_player()
   
   result = handle_inventory_action(player, 'unequip', data)
   return jsonify(result)
@@ -0,0 +1,49 @@
+import uuid
+from flask import current_app, g, request, session
+
+DEFAULT_PLAYER_NAME = "Demo"
+# zapytania, po których stan gracza na pewno się nie zmienił - nie zapisujemy go wtedy do SQLite
+READ_ONLY_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+def client_player_id():
+  # tylko do testów i debugowania: nagłówek, parametr zapytania albo pole w JSON
+  player_id = request.headers.get('X-Player-Id') or request.args.get('player_id')
+  if not player_id and request.is_json:
+    data = request.get_json(silent=True) or {}
+    if isinstance(data, dict):
+      player_id = data.get('player_id')
+  return str(player_id) if player_id else None
+
+def resolve_player_id():
+  # identyfikator wydaje serwer i trzyma go w podpisanej sesji Flaska, więc klient nie podszyje się pod innego gracza
+  if current_app.config.get('ALLOW_CLIENT_PLAYER_IDS'):
+    player_id = client_player_id()
+    if player_id:
+      return player_id
+  player_id = session.get('player_id')
+  if not player_id:
+    player_id = uuid.uuid4().hex
+    session['player_id'] = player_id
+    session.permanent = True
+  return player_id
+
+def current_player():
+  if 'player_entry' not in g:
+    player_store = current_app.config['PLAYER_STORE']
+    player_id = resolve_player_id()
+    entry = player_store.checkout(player_id, name=DEFAULT_PLAYER_NAME)
+    # zapytania tego samego gracza wykonują się po kolei, różni gracze równolegle
+    entry.lock.acquire()
+    g.player_id = player_id
+    g.player_entry = entry
+  return g.player_entry.player
+
+def release_player(exception=None):
+  entry = g.pop('player_entry', None)
+  if entry is None:
+    return
+  try:
+    save = request.method not in READ_ONLY_METHODS
+    current_app.config['PLAYER_STORE'].release(g.pop('player_id'), entry, save=save)
+  finally:
+    entry.lock.release()
@@ -1,15 +1,16 @@
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request
+from .player_context import current_player
 
 player_bp = Blueprint('player', __name__)
 
 @player_bp.route("/player", methods=['GET'])
 def get_player():
-  player = current_app.config['PLAYER']
+  player = current_player()
   return jsonify(player.to_dict())
 
 @player_bp.route("/player", methods=['PUT'])
 def update_player():
-  player = current_app.config['PLAYER']
+  player = current_player()
   data = request.get_json()
   
   if 'health' in data:
@@ -23,7 +24,7 @@ def update_player():
 
 @player_bp.route("/inventory", methods=['GET'])
 def get_inventory():
-  player = current_app.config['PLAYER']
+  player = current_player()
   
   inventory_items = getattr(player, 'inventory', [])
   items = []
@@ -1,11 +1,12 @@
 from flask import Blueprint, jsonify, request, current_app
+from .player_context import current_player
 
 quest_bp = Blueprint('quest', __name__)
 
 @quest_bp.route("/quests/available", methods=['GET'])
 def get_available_quests():
   quest_system = current_app.config['QUEST_SYSTEM']
-  player = current_app.config['PLAYER']
+  player = current_player()
   generated_quests = quest_system.get_available_quests(player)
   active_quests = quest_system.get_player_active_quests(player)
   available_quests = []
@@ -48,7 +49,7 @@ def get_available_quests():
 @quest_bp.route("/quests/active", methods=['GET'])
 def get_active_quests():
   quest_system = current_app.config['QUEST_SYSTEM']
-  player = current_app.config['PLAYER']
+  player = current_player()
   active_quests = quest_system.get_player_active_quests(player)
   
   formatted_quests = []
@@ -100,15 +101,14 @@ def get_active_quests():
 @quest_bp.route("/quests/generate", methods=['POST'])
 def generate_quest():
   quest_system = current_app.config['QUEST_SYSTEM']
-  player = current_app.config['PLAYER']
+  player = current_player()
   data = request.get_json()
   
   quest_type = data.get('type', None)  
   difficulty = data.get('difficulty', None)  
   
   try:
-    quest_system = current_app.config['QUEST_SYSTEM']
-    new_quest = quest_system.quest_generator.generate_quest(quest_type=quest_type, player_level=player.level)
+    new_quest = quest_system.take_generated_quest(player.level, quest_type)
     
     if new_quest:
       return jsonify({
@@ -142,7 +142,7 @@ def generate_quest():
 @quest_bp.route("/quests/refresh", methods=['POST'])
 def refresh_quests():
   quest_system = current_app.config['QUEST_SYSTEM']
-  player = current_app.config['PLAYER']
+  player = current_player()
   
   try:
     new_quest_count = quest_system.manual_refresh_quests(player.level)
@@ -196,7 +196,7 @@ def refresh_quests():
 @quest_bp.route("/quests/<quest_id>/accept", methods=['POST'])
 def accept_quest(quest_id):
   quest_system = current_app.config['QUEST_SYSTEM']
-  player = current_app.config['PLAYER']
+  player = current_player()
   
   try:
     success = quest_system.accept_quest(quest_id, player)
@@ -253,7 +253,7 @@ def accept_quest(quest_id):
 @quest_bp.route("/quests/<quest_id>/abandon", methods=['POST'])
 def abandon_quest(quest_id):
   quest_system = current_app.config['QUEST_SYSTEM']
-  player = current_app.config['PLAYER']
+  player = current_player()
   
   try:
     success = quest_system.abandon_quest(quest_id, player)
@@ -276,7 +276,7 @@ def abandon_quest(quest_id):
 @quest_bp.route("/quests/<quest_id>/progress", methods=['GET'])
 def get_quest_progress(quest_id):
   quest_system = current_app.config['QUEST_SYSTEM']
-  player = current_app.config['PLAYER']
+  player = current_player()
   
   try:
     quest = quest_system.get_quest_by_id(player, quest_id)
@@ -306,7 +306,7 @@ def get_quest_progress(quest_id):
 @quest_bp.route("/quests/actions/<location>", methods=['GET'])
 def get_quest_actions_for_location(location):
   quest_system = current_app.config['QUEST_SYSTEM']
-  player = current_app.config['PLAYER']
+  player = current_player()
   
   try:
     quest_actions = quest_system.get_quest_actions_for_location(player, location)
@@ -339,7 +339,7 @@ def get_quest_actions_for_location(location):
 @quest_bp.route("/quests/action", methods=['POST'])
 def perform_quest_action():
   quest_system = current_app.config['QUEST_SYSTEM']
-  player = current_app.config['PLAYER']
+  player = current_player()
   data = request.get_json()
   
   action = data.get('action', '')
@@ -390,7 +390,7 @@ def perform_quest_action():
 
 @quest_bp.route("/quests/debug/completed", methods=['GET'])
 def debug_completed_quests():
-  player = current_app.config['PLAYER']
+  player = current_player()
 
   if not hasattr(player, 'completed_quest_ids'):
     player.completed_quest_ids = set()
@@ -406,7 +406,7 @@ def debug_completed_quests():
 
 @quest_bp.route("/quests/debug/reset_completed", methods=['POST'])
 def debug_reset_completed():
-  player = current_app.config['PLAYER']
+  player = current_player()
   player.completed_quest_ids = set()
   player.completed_quest_types = {}
   
@@ -418,7 +418,7 @@ def debug_reset_completed():
 @quest_bp.route("/quests/debug/force_regenerate", methods=['POST'])
 def debug_force_regenerate():
   quest_system = current_app.config['QUEST_SYSTEM']
-  player = current_app.config['PLAYER']
+  player = current_player()
 
   quest_system.generated_quests_cache = {}
   quest_system.last_quest_generation = 0
@@ -434,7 +434,7 @@ def debug_force_regenerate():
 @quest_bp.route("/quests/pool/status", methods=['GET'])
 def get_quest_pool_status():
   quest_system = current_app.config['QUEST_SYSTEM']
-  player = current_app.config['PLAYER']
+  player = current_player()
   
   try:
     status = quest_system.check_quest_pool_health(player.level)
@@ -1,4 +1,5 @@
 from flask import Blueprint, jsonify, request, current_app
+from .player_context import current_player
 
 shop_bp = Blueprint('shop', __name__)
 
@@ -28,7 +29,7 @@ def buy_item():
   data = request.get_json()
   item_id = data.get('item_id', '')
   quantity = data.get('quantity', 1)
-  player = current_app.config['PLAYER']
+  player = current_player()
   merchant_inventory = current_app.config['MERCHANT_INVENTORY']
 
   item = None
@@ -80,7 +81,7 @@ def sell_item():
   item_id = data.get('item_id', '')
   quantity = data.get('quantity', 1)
   
-  player = current_app.config['PLAYER']
+  player = current_player()
   
   print(f"Selling item - ID: {item_id}, Type: {type(item_id)}")
   print(f"Inventory size: {len(player.inventory)}")
@@ -1,11 +1,12 @@
 from flask import Blueprint, jsonify, request, current_app
+from .player_context import current_player
 import random
 
 smithy_bp = Blueprint('smithy', __name__)
 
 @smithy_bp.route("/smithy/recipes", methods=['GET'])
 def get_smithy_recipes():
-  player = current_app.config['PLAYER']
+  player = current_player()
   crafting_system = current_app.config.get('CRAFTING_SYSTEM')
   
   try:
@@ -90,7 +91,7 @@ def get_smithy_recipes():
 def smithy_action():
   data = request.get_json()
   action = data.get('action', '')
-  player = current_app.config['PLAYER']
+  player = current_player()
   
   return handle_smithy_action(player, action, data)
 
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 from ai.dialog.engine import DialogEngine
+from ai.model_registry import model_registry
 import time
 
 def print_separator():
@@ -169,6 +170,8 @@ def main():
         print("\n\nDemo interrupted by user")
     except Exception as e:
         print(f"\nDemo error: {e}")
+    finally:
+        model_registry.unload(force=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -3,7 +3,11 @@
 
 import sys, time
 from ai.dialog.engine import DialogEngine
-from ai.dialog.tracker import conversation_tracker
+from ai.dialog.tracker import ConversationTracker
+from ai.model_registry import model_registry
+from ai.dialog.config_loader import ConfigLoader
+from ai.dialog.memory_index import build_memory_indexes
+from ai.dialog.lexicon import contains_modern_words, find_modern_words
 
 def test_fantasy_immersion():
     print("TEST 1: Fantasy Immersion Test")
@@ -141,12 +145,44 @@ def test_error_handling():
     print(f"Response length: {len(response)} characters")
     print(f"Response: {response[:100]}...")
 
+def test_memory_retrieval_plurals():
+    print("\n TEST 0: Memory Retrieval Singular/Plural Test")
+    print("=" * 50)
+
+    indexes = build_memory_indexes(ConfigLoader().load_config().get("characters", {}))
+    pairs = [
+        ("Tell me about the mine", "Tell me about the mines"),
+        ("Any news from the merchant?", "Any news from the merchants?"),
+        ("Seen any bandit lately?", "Seen any bandits lately?")
+    ]
+    for character, index in indexes.items():
+        for singular, plural in pairs:
+            assert index.search(singular) == index.search(plural), f"{character}: '{singular}' vs '{plural}'"
+        assert index.search("Tell me about the mines"), f"{character}: no memory about the mines"
+    print(f"Singular and plural queries match for {len(indexes)} characters")
+
+def test_modern_word_plurals():
+    print("\n TEST 0b: Modern Word Plurals Test")
+    print("=" * 50)
+
+    for text, word in [
+        ("Do you have computers?", "computer"),
+        ("I love my smartphones", "smartphone"),
+        ("cars are fast", "car"),
+        ("Any emails for me?", "email")
+    ]:
+        assert contains_modern_words(text), f"Not detected: '{text}'"
+        assert find_modern_words(text) == {word}, f"Wrong word for '{text}': {find_modern_words(text)}"
+    for text in ["I said I care about the ale", "Happy to help, friend"]:
+        assert not contains_modern_words(text), f"False positive: '{text}'"
+    print("Plural modern words detected, medieval words left alone")
+
 def generate_quality_report():
     print("\nFINAL QUALITY REPORT")
     print("=" * 50)
     
-    engine = DialogEngine()
-    report = engine.get_quality_report()
+    tracker = ConversationTracker(analytics_config=ConfigLoader().load_config().get("analytics", {}))
+    report = tracker.generate_quality_report()
     
     print("Global Conversation Quality Report:")
     print(f"Sessions analyzed: {report.get('total_sessions', 0)}")
@@ -166,6 +202,8 @@ def main():
     print("=" * 60)
     
     try:
+        test_memory_retrieval_plurals()
+        test_modern_word_plurals()
         test_fantasy_immersion()
         test_conversation_tracking() 
         test_character_consistency()
@@ -178,6 +216,9 @@ def main():
     except Exception as e:
         print(f"\n Test failed with error: {e}")
         return 1
+    finally:
+        # wszystkie testy korzystały z jednej kopii wag z rejestru
+        model_registry.unload(force=True)
     
     return 0
 
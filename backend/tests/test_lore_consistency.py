@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import time, re
+import sys, time, re
 from ai.dialog.engine import DialogEngine
+from ai.model_registry import model_registry
 
 class LoreConsistencyTester:
-    def __init__(self):
-        self.engine = DialogEngine()
+    def __init__(self, quantization=None):
+        self.engine = DialogEngine(quantization=quantization)
         self.test_results = []
         
     def test_character_knowledge(self, character, question, expected_keywords, topic):
@@ -306,22 +307,59 @@ class LoreConsistencyTester:
             'character_scores': {char: sum(scores)/len(scores) for char, scores in characters.items()}
         }
 
-def main():
-    print("DIALOG ENGINE - LORE CONSISTENCY TESTER")
-    print("Testing character depth and world knowledge integration")
-    print("="*60)
-    
-    tester = LoreConsistencyTester()
+def run_lore_suite(quantization=None):
+    tester = LoreConsistencyTester(quantization)
     tester.test_memory_triggers()
     tester.test_contextual_responses() 
     tester.test_character_consistency()
     tester.test_world_knowledge_integration()
     
     report = tester.generate_report()
+    tester.engine.close()
+    return report
+
+def compare_quantization(mode="dynamic_int8", max_score_drop=10.0):
+    print("DIALOG ENGINE - QUANTIZATION QUALITY CHECK")
+    print(f"Comparing full precision against '{mode}'")
+    print("="*60)
+
+    baseline = run_lore_suite("none")
+    model_registry.unload()
+    quantized = run_lore_suite(mode)
+    model_registry.unload()
+    if not baseline or not quantized:
+        print("Quality check failed - no scored tests")
+        return False
+
+    score_drop = baseline['average_score'] - quantized['average_score']
+    print(f"\nQUANTIZATION QUALITY CHECK")
+    print(f"   Full precision: {baseline['average_score']:.1f}/100")
+    print(f"   {mode}: {quantized['average_score']:.1f}/100")
+    print(f"   Score drop: {score_drop:.1f} (allowed: {max_score_drop:.1f})")
+
+    for char, score in baseline['character_scores'].items():
+        quantized_score = quantized['character_scores'].get(char, 0)
+        print(f"   {char}: {score:.1f} -> {quantized_score:.1f}")
+
+    passed = score_drop <= max_score_drop
+    print("Quantized mode ACCEPTED" if passed else "Quantized mode REJECTED - quality loss too high")
+    print("="*60)
+    return passed
+
+def main():
+    if "--compare-quantization" in sys.argv:
+        return 0 if compare_quantization() else 1
+
+    print("DIALOG ENGINE - LORE CONSISTENCY TESTER")
+    print("Testing character depth and world knowledge integration")
+    print("="*60)
+    
+    report = run_lore_suite()
     
     print(f"\nLORE CONSISTENCY TEST COMPLETED!")
     print(f"Final Score: {report['average_score']:.1f}/100" if report else "Test failed")
     print("="*60)
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
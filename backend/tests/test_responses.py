@@ -54,6 +54,7 @@ def test_improved_responses():
         else:
             print("Odpowiedź prawidłowa")
     
+    engine.close()
     print(f"\n=== Test zakończony ===")
 
 if __name__ == "__main__":
@@ -5,6 +5,7 @@ from datetime import datetime
 from typing import Dict, List, Tuple, Any
 from ai.dialog.engine import DialogEngine
 from ai.dialog.tracker import ConversationTracker
+from ai.model_registry import model_registry
 
 class RPGDialogTrainer:
     def __init__(self):
@@ -475,6 +476,9 @@ def main():
     except Exception as e:
         print(f"\nBłąd podczas treningu: {e}")
         trainer.logger.error(f"Krytyczny błąd: {e}")
+    finally:
+        trainer.engine.close()
+        model_registry.unload()
 
 
 if __name__ == "__main__":
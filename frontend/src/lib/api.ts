@@ -5,6 +5,7 @@ const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5000';
 const api = axios.create({
   baseURL: API_BASE_URL,
   timeout: 120000, 
+  withCredentials: true,
   headers: {
     'Content-Type': 'application/json',
   },